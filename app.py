@@ -1,8 +1,12 @@
 """Página principal da Rifa Amiga — exibição pública."""
 
-import os
+import math
+import sqlite3
+import uuid
+
 import streamlit as st
 
+from utils.admission import RateLimited, get_admission_controller
 from utils.components import (
     format_number,
     format_numbers_list,
@@ -10,10 +14,16 @@ from utils.components import (
     render_legend,
     render_number_grid,
     render_pix_box,
+    render_pix_charge,
+    render_prize_image,
 )
-from utils.raffle_service import get_active_raffle, get_tickets, reserve_tickets
-from utils.storage import upload_proof
+from utils.pix import get_pix_charge
+from utils.prize_image import get_prize_variants
+from utils.raffle_service import get_tickets_by_phone, normalize_phone
+from utils.settings import get_setting
+from utils.snapshot import PublicSnapshot, get_snapshot_store
 from utils.styles import MAIN_PAGE_CSS
+from utils.submission_queue import Submission, get_submission_queue
 
 # ── Configuração da página ───────────────────────────────────────────────────
 st.set_page_config(
@@ -25,31 +35,39 @@ st.set_page_config(
 st.markdown(MAIN_PAGE_CSS, unsafe_allow_html=True)
 
 
-# ── Dados com cache ──────────────────────────────────────────────────────────
-@st.cache_data(ttl=10)
-def _load_raffle():
-    return get_active_raffle()
+# ── Dados ────────────────────────────────────────────────────────────────────
+def _load_snapshot() -> PublicSnapshot | None:
+    """Lê a rifa e a grade do snapshot local (revalidado em segundo plano)."""
+    try:
+        return get_snapshot_store().get()
+    except Exception:
+        # Só chega aqui sem nenhum snapshot salvo e com o backend fora do ar.
+        return None
+
+
+@st.cache_data(ttl=30, max_entries=1000, show_spinner=False)
+def _lookup_my_numbers(raffle_id: str, phone: str, code: str) -> list[dict]:
+    # `phone` chega normalizado: uma entrada de cache por telefone.
+    return get_tickets_by_phone(raffle_id, phone, code or None)
 
 
-@st.cache_data(ttl=5)
-def _load_tickets(raffle_id: str):
-    return get_tickets(raffle_id, columns="number, status, buyer_name")
+def _session_key() -> str:
+    """Identificador estável da sessão do navegador (para rate limiting)."""
+    if "session_key" not in st.session_state:
+        st.session_state["session_key"] = uuid.uuid4().hex
+    return st.session_state["session_key"]
 
 
 # ── Seções da página ─────────────────────────────────────────────────────────
 def _show_raffle_header(raffle: dict) -> None:
     """Exibe título, descrição e dados PIX da rifa."""
     st.markdown(f"### {raffle['title']}")
-    # Exibe a imagem do prêmio se existir
-    # Exibe a imagem do prêmio se existir, centralizada e responsiva
-    if os.path.exists("assets/premio.png"):
+    # Imagem do prêmio (variantes WebP codificadas uma vez por processo)
+    variants = get_prize_variants()
+    if variants:
         col1, col2, col3 = st.columns([1, 2, 1])
         with col2:
-            st.image(
-                "assets/premio.png",
-                caption="🏆 Prêmio: Sua chance de ganhar!",
-                use_container_width=True
-            )
+            render_prize_image(variants, "🏆 Prêmio: Sua chance de ganhar!")
 
     if raffle.get("description"):
         st.markdown(raffle["description"])
@@ -91,6 +109,19 @@ def _show_reservation_form(raffle: dict, available_numbers: list[int]) -> None:
         f"**{len(selected_nums)}** número(s) selecionado(s) — "
         f"Total: **R$ {total:.2f}**"
     )
+    if raffle.get("pix_key"):
+        try:
+            charge = get_pix_charge(
+                raffle["id"],
+                round(total * 100),
+                raffle["pix_key"],
+                raffle.get("pix_name", ""),
+            )
+        except ValueError:
+            # Chave gravada antes da validação do painel: fica só a chave acima.
+            charge = None
+        if charge is not None:
+            render_pix_charge(charge, total)
 
     with st.form("reserve_form"):
         buyer_name = st.text_input("Seu nome completo")
@@ -129,27 +160,171 @@ def _handle_reservation(
         st.error("Anexe o comprovante de pagamento.")
         return
 
-    with st.spinner("Enviando comprovante..."):
-        proof_url = upload_proof(raffle["id"], selected_nums[0], proof_file)
-        reserve_tickets(
-            raffle["id"], selected_nums, buyer_name.strip(),
-            buyer_phone.strip(), proof_url,
+    admission = get_admission_controller()
+    try:
+        admission.check_rate(
+            [f"session:{_session_key()}", f"phone:{normalize_phone(buyer_phone)}"]
         )
-        _load_tickets.clear()
-        _load_raffle.clear()
+    except RateLimited as e:
+        st.warning(
+            "Muitas tentativas seguidas. Tente novamente em "
+            f"{math.ceil(e.retry_after)} segundo(s)."
+        )
+        return
 
-    st.success(
-        f"Número(s) **{format_numbers_list(selected_nums)}** reservado(s) "
-        "com sucesso! Aguarde a confirmação do pagamento."
-    )
+    try:
+        code = get_submission_queue().enqueue(
+            raffle["id"],
+            selected_nums,
+            buyer_name.strip(),
+            buyer_phone.strip(),
+            proof_file.getvalue(),
+            proof_file.name,
+            proof_file.type,
+        )
+    except sqlite3.Error:
+        st.error("Não foi possível registrar seu envio. Tente novamente.")
+        return
+
+    st.session_state.setdefault("my_submissions", []).append(code)
     st.rerun()
 
 
+def _show_submission_status(sub: Submission) -> bool:
+    """Mostra o andamento de uma submissão; True se ainda está na fila."""
+    code = sub.id
+    if sub.status in ("pending", "processing"):
+        position = get_submission_queue().position(code)
+        progress = (
+            f"Sua reserva é a **{position}ª** da fila."
+            if sub.status == "pending" and position and position > 1
+            else "Processando a reserva..."
+        )
+        st.info(
+            f"Recebemos seu comprovante (código **{code}**) para o(s) "
+            f"número(s) **{format_numbers_list(sub.numbers)}**. {progress}"
+        )
+        return True
+    if sub.status == "done":
+        announced = st.session_state.setdefault("announced_submissions", set())
+        if code not in announced:
+            # Reserva recém-concluída: a grade precisa refletir o resultado.
+            announced.add(code)
+            get_snapshot_store().refresh_async()
+        if sub.reserved_numbers:
+            st.success(
+                f"Número(s) **{format_numbers_list(sub.reserved_numbers)}** "
+                f"reservado(s) com sucesso (código **{code}**)! "
+                "Aguarde a confirmação do pagamento."
+            )
+        _warn_missing_numbers(sub)
+        return False
+    st.error(
+        f"Não conseguimos concluir a reserva de código **{code}**. "
+        "Fale com a organização informando esse código."
+    )
+    return False
+
+
+def _warn_missing_numbers(sub: Submission) -> None:
+    if sub.missing_numbers:
+        st.warning(
+            f"O(s) número(s) **{format_numbers_list(sub.missing_numbers)}** "
+            "já tinha(m) sido reservado(s) por outra pessoa. "
+            "Fale com a organização sobre o valor pago."
+        )
+
+
+def _show_my_submissions() -> None:
+    """Mostra o andamento das reservas enviadas (ou consultadas) nesta sessão."""
+    codes = st.session_state.get("my_submissions", [])
+    if not codes:
+        return
+
+    queue = get_submission_queue()
+    in_progress = False
+    for code in codes:
+        sub = queue.get(code)
+        if sub is not None:
+            in_progress |= _show_submission_status(sub)
+
+    if in_progress and st.button("Atualizar status", key="refresh_submissions"):
+        st.rerun()
+
+
+_STATUS_LABELS = {
+    "reserved": "⏳ Aguardando confirmação do pagamento",
+    "confirmed": "✅ Pagamento confirmado",
+}
+
+
+def _find_submission(raffle_id: str, phone: str, code: str) -> Submission | None:
+    """Submissão da fila com este código, se for desta rifa e deste telefone."""
+    sub = get_submission_queue().get(code) if code else None
+    if sub is None or sub.raffle_id != raffle_id:
+        return None
+    return sub if normalize_phone(sub.buyer_phone) == phone else None
+
+
+def _show_my_numbers_lookup(raffle: dict) -> None:
+    """Consulta dos números de um comprador pelo telefone.
+
+    Com o código da reserva, mostra também o andamento do envio na fila —
+    para quem fechou a página antes de ele ser processado.
+    """
+    with st.expander("🔎 Meus números"):
+        with st.form("my_numbers_form"):
+            # Chaves explícitas: o formulário de reserva tem um campo com o
+            # mesmo rótulo e placeholder.
+            phone = st.text_input(
+                "Telefone com DDD", placeholder="(62) 99999-9999", key="lookup_phone"
+            )
+            code = st.text_input("Código da reserva (opcional)", key="lookup_code")
+            submitted = st.form_submit_button("Consultar", use_container_width=True)
+
+        if not submitted:
+            return
+        digits = normalize_phone(phone)
+        if not digits:
+            st.error("Informe o telefone usado na reserva.")
+            return
+
+        code = code.strip().upper()
+        sub = _find_submission(raffle["id"], digits, code)
+        if sub is not None and sub.status != "done":
+            _show_submission_status(sub)
+            # Segue acompanhando o envio no topo da página nesta sessão.
+            my_submissions = st.session_state.setdefault("my_submissions", [])
+            if code not in my_submissions:
+                my_submissions.append(code)
+            return
+        if sub is not None:
+            _warn_missing_numbers(sub)
+
+        try:
+            tickets = _lookup_my_numbers(raffle["id"], digits, code)
+        except Exception:
+            st.error("Não foi possível consultar agora. Tente novamente em instantes.")
+            return
+
+        if not tickets:
+            st.info("Nenhum número encontrado para este telefone.")
+            return
+        for ticket in tickets:
+            label = _STATUS_LABELS.get(ticket["status"], ticket["status"])
+            st.markdown(f"**{format_number(ticket['number'])}** — {label}")
+
+
 # ── Fluxo principal ──────────────────────────────────────────────────────────
 def main() -> None:
     st.markdown("# :wheelchair: Rifa Amiga")
 
-    raffle = _load_raffle()
+    snapshot = _load_snapshot()
+    if snapshot is None:
+        st.error("Não foi possível carregar a rifa agora. Tente novamente em instantes.")
+        st.stop()
+
+    raffle = snapshot.raffle
     if raffle is None:
         st.info("Nenhuma rifa ativa no momento. Volte mais tarde!")
         st.stop()
@@ -160,16 +335,26 @@ def main() -> None:
     st.divider()
     render_legend()
 
-    tickets = _load_tickets(raffle["id"])
+    _show_my_submissions()
+    tickets = snapshot.tickets
+    if snapshot.is_stale:
+        tz = get_setting("TIMEZONE", "America/Sao_Paulo")
+        st.caption(f"⏱️ dados de {snapshot.fetched_at_label(tz)}")
     render_number_grid(tickets)
 
-    if raffle.get("winner_number") is None:
+    if raffle.get("winner_number") is None and snapshot.is_stale:
+        st.warning(
+            "Estamos com dificuldade para atualizar a rifa. As reservas ficam "
+            "suspensas até os dados voltarem a ficar em dia — tente em instantes."
+        )
+    elif raffle.get("winner_number") is None:
         available = [t["number"] for t in tickets if t["status"] == "available"]
         if not available:
             st.warning("Todos os números já foram reservados ou confirmados!")
         else:
             _show_reservation_form(raffle, available)
 
+    _show_my_numbers_lookup(raffle)
     render_footer()
 
 
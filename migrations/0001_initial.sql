@@ -1,5 +1,6 @@
 -- =============================================================================
--- Rifa Amiga — SQL para rodar no Supabase SQL Editor
+-- Rifa Amiga — 0001: esquema inicial (antigo supabase_setup.sql)
+-- Aplique com scripts/migrate.py ou cole no Supabase SQL Editor.
 -- =============================================================================
 
 -- 1. Tabela de rifas
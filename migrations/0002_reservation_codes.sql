@@ -0,0 +1,7 @@
+-- =============================================================================
+-- Rifa Amiga — 0002: codigo de reserva
+-- A fila de reservas grava o codigo entregue ao comprador em cada numero;
+-- as retentativas usam o codigo para achar o que ja foi reservado.
+-- =============================================================================
+
+alter table public.tickets add column if not exists reservation_code text;
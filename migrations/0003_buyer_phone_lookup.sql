@@ -0,0 +1,11 @@
+-- =============================================================================
+-- Rifa Amiga — 0003: consulta "Meus numeros" pelo telefone
+-- O app passa a gravar o telefone so com digitos; os ja gravados com
+-- pontuacao sao normalizados aqui.
+-- =============================================================================
+
+create index if not exists idx_tickets_raffle_phone on public.tickets(raffle_id, buyer_phone);
+
+update public.tickets
+    set buyer_phone = regexp_replace(buyer_phone, '\D', '', 'g')
+    where buyer_phone ~ '\D';
@@ -0,0 +1,85 @@
+-- =============================================================================
+-- Rifa Amiga — 0004: historico de eventos dos tickets e agregados de vendas
+-- =============================================================================
+
+-- Historico append-only das transicoes de cada ticket (reserva, confirmacao,
+-- rejeicao). Escrito so pelo trigger abaixo, na mesma transacao da mudanca
+-- de status; nenhum cliente insere, atualiza ou apaga eventos.
+create table if not exists public.ticket_events (
+    id bigint generated always as identity primary key,
+    raffle_id uuid not null references public.raffles(id) on delete cascade,
+    ticket_number int not null,
+    event_type text not null check (event_type in ('reserved', 'confirmed', 'rejected')),
+    buyer_name text,
+    buyer_phone text,
+    reservation_code text,
+    created_at timestamptz not null default now()
+);
+create index if not exists idx_ticket_events_raffle_created_at
+    on public.ticket_events(raffle_id, created_at, id);
+
+-- Uma linha por ticket cujo status mudou. Na rejeicao os dados do comprador
+-- ja foram apagados da linha nova: o evento guarda os da linha antiga.
+create or replace function public.log_ticket_event()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    kind text;
+    buyer public.tickets;
+begin
+    kind := case new.status
+        when 'reserved' then 'reserved'
+        when 'confirmed' then 'confirmed'
+        when 'available' then 'rejected'
+    end;
+    if kind is null then
+        return null;
+    end if;
+    buyer := case when kind = 'rejected' then old else new end;
+    insert into public.ticket_events (
+        raffle_id, ticket_number, event_type, buyer_name, buyer_phone, reservation_code
+    ) values (
+        new.raffle_id, new.number, kind,
+        buyer.buyer_name, buyer.buyer_phone, buyer.reservation_code
+    );
+    return null;
+end;
+$$;
+
+drop trigger if exists trg_tickets_log_event on public.tickets;
+create trigger trg_tickets_log_event
+    after update of status on public.tickets
+    for each row
+    when (old.status is distinct from new.status)
+    execute function public.log_ticket_event();
+
+-- Agregados de vendas mantidos incrementalmente a partir de ticket_events;
+-- last_event_at marca ate onde (created_at) o historico ja foi lido.
+create table if not exists public.ticket_event_rollups (
+    raffle_id uuid primary key references public.raffles(id) on delete cascade,
+    last_event_at timestamptz,
+    state jsonb not null default '{}'::jsonb,
+    updated_at timestamptz not null default now()
+);
+
+alter table public.ticket_events enable row level security;
+alter table public.ticket_event_rollups enable row level security;
+
+create policy "Leitura publica de ticket_events"
+    on public.ticket_events for select
+    using (true);
+
+create policy "Leitura publica de ticket_event_rollups"
+    on public.ticket_event_rollups for select
+    using (true);
+
+create policy "Insert ticket_event_rollups anonimo"
+    on public.ticket_event_rollups for insert
+    with check (true);
+
+create policy "Update ticket_event_rollups anonimo"
+    on public.ticket_event_rollups for update
+    using (true);
@@ -0,0 +1,26 @@
+-- =============================================================================
+-- Rifa Amiga — 0005: comprovantes enderecados pelo conteudo
+-- =============================================================================
+
+alter table public.tickets add column if not exists proof_hash text;
+
+-- Indice de comprovantes por conteudo (SHA-256): evita reenvio dos mesmos
+-- bytes e guarda a primeira reserva que usou cada comprovante. Os objetos
+-- do bucket nunca sao regravados: nao ha policy de update em storage.objects.
+create table if not exists public.proof_hashes (
+    sha256 text primary key,
+    path text not null,
+    first_raffle_id uuid references public.raffles(id) on delete set null,
+    first_reservation_code text,
+    created_at timestamptz not null default now()
+);
+
+alter table public.proof_hashes enable row level security;
+
+create policy "Leitura publica de proof_hashes"
+    on public.proof_hashes for select
+    using (true);
+
+create policy "Insert proof_hashes anonimo"
+    on public.proof_hashes for insert
+    with check (true);
@@ -0,0 +1,96 @@
+-- =============================================================================
+-- Rifa Amiga — 0006: arquivamento de rifas encerradas
+-- Move os tickets de uma rifa encerrada para tickets_archive e deixa um
+-- resumo em raffle_summaries, tudo numa transacao. Rodar de novo numa rifa
+-- ja arquivada so devolve o resumo.
+-- =============================================================================
+
+alter table public.raffles add column if not exists archived_at timestamptz;
+
+-- Rifas arquivadas: um resumo por rifa e os tickets vendidos compactados
+-- num unico jsonb (numeros disponiveis nao sao guardados). Os tickets saem de
+-- public.tickets, que fica so com as rifas em andamento.
+create table if not exists public.raffle_summaries (
+    raffle_id uuid primary key references public.raffles(id) on delete cascade,
+    title text not null,
+    total_numbers int not null,
+    price numeric(10,2) not null,
+    confirmed_count int not null,
+    reserved_count int not null,
+    revenue numeric(12,2) not null,
+    winner_number int,
+    winner_name text,
+    created_at timestamptz not null,
+    archived_at timestamptz not null default now()
+);
+
+-- Cada item de tickets: [numero, status, nome, telefone, codigo, confirmado_em]
+create table if not exists public.tickets_archive (
+    raffle_id uuid primary key references public.raffles(id) on delete cascade,
+    tickets jsonb not null default '[]'::jsonb
+);
+
+alter table public.raffle_summaries enable row level security;
+-- Sem policies: o arquivo frio so e escrito pela funcao archive_raffle
+alter table public.tickets_archive enable row level security;
+
+create policy "Leitura publica de raffle_summaries"
+    on public.raffle_summaries for select
+    using (true);
+
+create or replace function public.archive_raffle(p_raffle_id uuid)
+returns setof public.raffle_summaries
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+    r public.raffles;
+begin
+    select * into r from public.raffles where id = p_raffle_id for update;
+    if not found then
+        raise exception 'Rifa % nao encontrada', p_raffle_id;
+    end if;
+    if r.status <> 'finished' then
+        raise exception 'Apenas rifas encerradas podem ser arquivadas';
+    end if;
+
+    if r.archived_at is null then
+        insert into public.raffle_summaries (
+            raffle_id, title, total_numbers, price, confirmed_count,
+            reserved_count, revenue, winner_number, winner_name, created_at
+        )
+        select
+            r.id, r.title, r.total_numbers, r.price,
+            count(*) filter (where t.status = 'confirmed'),
+            count(*) filter (where t.status = 'reserved'),
+            r.price * count(*) filter (where t.status = 'confirmed'),
+            r.winner_number,
+            max(t.buyer_name) filter (where t.number = r.winner_number),
+            r.created_at
+        from public.tickets t
+        where t.raffle_id = r.id;
+
+        insert into public.tickets_archive (raffle_id, tickets)
+        select r.id, coalesce(jsonb_agg(
+            jsonb_build_array(
+                t.number, t.status, t.buyer_name, t.buyer_phone,
+                t.reservation_code, t.confirmed_at
+            ) order by t.number
+        ), '[]'::jsonb)
+        from public.tickets t
+        where t.raffle_id = r.id and t.status <> 'available';
+
+        delete from public.tickets where raffle_id = r.id;
+        update public.raffles set archived_at = now() where id = r.id;
+    end if;
+
+    return query select * from public.raffle_summaries where raffle_id = r.id;
+end;
+$$;
+
+-- A funcao apaga tickets com os privilegios do dono (security definer).
+-- O Postgres concede EXECUTE a PUBLIC (e o Supabase, a anon) por padrao, e o
+-- PostgREST a expoe como RPC: so usuarios logados (o painel) podem chama-la.
+revoke execute on function public.archive_raffle(uuid) from public, anon;
+grant execute on function public.archive_raffle(uuid) to authenticated;
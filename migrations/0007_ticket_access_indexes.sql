@@ -0,0 +1,30 @@
+-- =============================================================================
+-- Rifa Amiga — 0007: indices compostos alinhados as consultas do app
+-- Cada indice cobre consultas de utils/ (scripts/check_query_plans.py
+-- verifica que nenhuma delas vira varredura completa).
+-- =============================================================================
+
+-- Grade, sorteio e contagens: filtram por (raffle_id, status), ordenam por number
+create index if not exists idx_tickets_raffle_status_number
+    on public.tickets(raffle_id, status, number);
+
+-- Fila de reservas do painel: keyset em reserved_at, desempate por number
+create index if not exists idx_tickets_raffle_status_reserved_number
+    on public.tickets(raffle_id, status, reserved_at, number);
+
+-- Retentativas da fila de reservas: numeros ja gravados para um codigo
+create index if not exists idx_tickets_raffle_reservation_code
+    on public.tickets(raffle_id, reservation_code, number);
+
+-- Rifa ativa e rifas encerradas ainda nao arquivadas
+create index if not exists idx_raffles_status_created_at
+    on public.raffles(status, created_at);
+
+-- Aba "Historico": resumos do mais recente para o mais antigo
+create index if not exists idx_raffle_summaries_archived_at
+    on public.raffle_summaries(archived_at);
+
+-- Indices da 0001 ja cobertos pelos compostos: raffle_id e prefixo da
+-- constraint unique(raffle_id, number), e status sozinho nunca e filtro.
+drop index if exists public.idx_tickets_raffle_id;
+drop index if exists public.idx_tickets_status;
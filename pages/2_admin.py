@@ -4,41 +4,53 @@ from __future__ import annotations
 
 import streamlit as st
 
+from utils.analytics import CONFIRMATION_BUCKETS, refresh_sales_rollup
+from utils.call_policy import get_call_policy
 from utils.components import format_number
+from utils.pix import normalize_pix_key
 from utils.raffle_service import (
-    confirm_ticket,
+    archive_raffle,
     confirm_ticket_manual,
     confirm_tickets_bulk,
+    count_tickets_by_status,
     create_raffle,
     draw_winner,
     get_active_raffle,
+    get_raffle_summaries,
+    get_reservation_page,
     get_tickets,
     get_tickets_by_status,
+    get_unarchived_finished_raffles,
     get_winner_ticket,
-    reject_ticket,
+    group_reservations,
     reject_tickets_bulk,
     update_raffle,
 )
+from utils.settings import get_setting
+from utils.storage import get_proof_origins
 from utils.styles import HIDE_STREAMLIT_CHROME
-from utils.supabase_client import get_supabase
+from utils.supabase_client import ADMIN_SESSION_KEY, get_client_pool
 
 # ── Configuração da página ───────────────────────────────────────────────────
 st.set_page_config(page_title="Admin — Rifa Amiga", page_icon=":lock:", layout="wide")
 st.markdown(HIDE_STREAMLIT_CHROME, unsafe_allow_html=True)
 
-sb = get_supabase()
-
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  AUTENTICAÇÃO
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 def _init_auth() -> bool:
-    """Gerencia login. Retorna True se autenticado."""
-    if "admin_session" not in st.session_state:
-        st.session_state["admin_session"] = None
+    """Gerencia login. Retorna True se autenticado.
 
-    if st.session_state["admin_session"] is not None:
+    A sessão guarda só o identificador do cliente autenticado no pool; se ele
+    expirou por ociosidade, volta para a tela de login.
+    """
+    key = st.session_state.get(ADMIN_SESSION_KEY)
+    if key is not None and get_client_pool().get(key) is not None:
         return True
+    st.session_state[ADMIN_SESSION_KEY] = None
+    if key is not None:
+        st.info("Sessão expirada. Entre novamente.")
 
     st.markdown("## :lock: Login do Administrador")
     with st.form("login_form"):
@@ -46,10 +58,9 @@ def _init_auth() -> bool:
         password = st.text_input("Senha", type="password")
         if st.form_submit_button("Entrar", use_container_width=True):
             try:
-                resp = sb.auth.sign_in_with_password(
-                    {"email": email, "password": password}
+                st.session_state[ADMIN_SESSION_KEY] = get_client_pool().sign_in(
+                    email, password
                 )
-                st.session_state["admin_session"] = resp.session
                 st.rerun()
             except Exception as e:
                 st.error(f"Falha no login: {e}")
@@ -64,17 +75,37 @@ if not _init_auth():
 st.markdown("## :shield: Painel Administrativo")
 
 if st.sidebar.button("Sair"):
-    st.session_state["admin_session"] = None
+    get_client_pool().sign_out(st.session_state[ADMIN_SESSION_KEY])
+    st.session_state[ADMIN_SESSION_KEY] = None
     st.rerun()
 
+_BREAKER_LABELS = {
+    "closed": ":green[fechado] — backend respondendo",
+    "open": ":red[aberto] — chamadas falhando na hora",
+    "half_open": ":orange[meio-aberto] — testando o backend",
+}
+
+with st.sidebar.expander("Saúde do backend"):
+    _backend = get_call_policy().stats()
+    st.markdown(f"**Disjuntor:** {_BREAKER_LABELS[_backend['breaker']]}")
+    st.caption(f"Aberto {_backend['times_opened']} vez(es) desde o início do processo.")
+    _clients = get_client_pool().stats()
+    st.caption(
+        f"Clientes autenticados: {_clients['em uso']} em uso, {_clients['livres']} livre(s)."
+    )
+    if _backend["operations"]:
+        st.dataframe(_backend["operations"], hide_index=True, use_container_width=True)
+    else:
+        st.caption("Nenhuma chamada registrada ainda.")
+
 
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 #  ABAS
 # ━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━━
 raffle = get_active_raffle()
 
-tab_config, tab_reservas, tab_manual, tab_sorteio, tab_visao = st.tabs(
-    ["Config", "Reservas", "Manual", "Sorteio", "Visão geral"]
+tab_config, tab_reservas, tab_manual, tab_sorteio, tab_visao, tab_historico = st.tabs(
+    ["Config", "Reservas", "Manual", "Sorteio", "Visão geral", "Histórico"]
 )
 
 
@@ -95,18 +126,23 @@ def _tab_config_create() -> None:
         if st.form_submit_button("Criar rifa", use_container_width=True):
             if not title.strip() or not pix_key.strip():
                 st.error("Preencha título e chave PIX.")
-            else:
-                with st.spinner("Criando rifa..."):
-                    create_raffle(
-                        title=title.strip(),
-                        description=description.strip(),
-                        total_numbers=int(total_numbers),
-                        price=float(price),
-                        pix_key=pix_key.strip(),
-                        pix_name=pix_name.strip(),
-                    )
-                st.success(f"Rifa criada com {int(total_numbers)} números!")
-                st.rerun()
+                return
+            try:
+                pix_key = normalize_pix_key(pix_key)
+            except ValueError as e:
+                st.error(str(e))
+                return
+            with st.spinner("Criando rifa..."):
+                create_raffle(
+                    title=title.strip(),
+                    description=description.strip(),
+                    total_numbers=int(total_numbers),
+                    price=float(price),
+                    pix_key=pix_key,
+                    pix_name=pix_name.strip(),
+                )
+            st.success(f"Rifa criada com {int(total_numbers)} números!")
+            st.rerun()
 
 
 def _tab_config_edit(raffle: dict) -> None:
@@ -127,12 +163,17 @@ def _tab_config_edit(raffle: dict) -> None:
         )
 
         if st.form_submit_button("Salvar alterações", use_container_width=True):
+            try:
+                new_pix = normalize_pix_key(new_pix)
+            except ValueError as e:
+                st.error(str(e))
+                return
             update_raffle(
                 raffle["id"],
                 title=new_title.strip(),
                 description=new_desc.strip(),
                 price=float(new_price),
-                pix_key=new_pix.strip(),
+                pix_key=new_pix,
                 pix_name=new_pix_name.strip(),
             )
             st.success("Rifa atualizada!")
@@ -147,15 +188,66 @@ with tab_config:
 
 
 # ── TAB: Reservas pendentes ──────────────────────────────────────────────────
-def _render_ticket_expander(ticket: dict) -> None:
-    """Renderiza um expander com detalhes e ações para um ticket reservado."""
-    label = f"Número {format_number(ticket['number'])} — {ticket.get('buyer_name', 'Sem nome')}"
+# Filtro de idade: rótulo → minutos desde a reserva
+_AGE_FILTERS: dict[str, int | None] = {
+    "Qualquer idade": None,
+    "Mais de 1 h": 60,
+    "Mais de 6 h": 360,
+    "Mais de 24 h": 1440,
+}
+
+
+def _flash(message: str, kind: str = "success") -> None:
+    """Guarda uma mensagem para a próxima renderização da fila de reservas."""
+    st.session_state["reservas_flash"] = (kind, message)
+
+
+# Callbacks dos botões: rodam antes do fragmento, que já busca a página
+# atualizada em seguida (sem rerun extra).
+def _confirm_reservations(tickets: list[dict]) -> None:
+    count = confirm_tickets_bulk(tickets)
+    _flash(f"{count} número(s) confirmado(s)!")
+
+
+def _reject_reservations(tickets: list[dict]) -> None:
+    count = reject_tickets_bulk(tickets)
+    _flash(f"{count} número(s) liberado(s).", "warning")
+
+
+def _next_page(cursor: str) -> None:
+    st.session_state["reservas_cursors"].append(cursor)
+
+
+def _previous_page() -> None:
+    st.session_state["reservas_cursors"].pop()
+
+
+def _render_reservation_group(group: list[dict], reused_from: str | None = None) -> None:
+    """Renderiza um expander com detalhes e ações para uma reserva.
+
+    Uma reserva reúne os números enviados juntos (mesmo código e
+    comprovante). `reused_from` é o código da reserva que enviou o mesmo
+    comprovante antes.
+    """
+    first = group[0]
+    code = first.get("reservation_code")
+    label = ", ".join(format_number(t["number"]) for t in group)
+    label = f"{label} — {first.get('buyer_name', 'Sem nome')}"
+    if reused_from is not None:
+        label = f"⚠️ {label} — comprovante repetido"
+    key = code or first["id"]
     with st.expander(label, expanded=False):
-        st.write(f"**Nome:** {ticket.get('buyer_name', '-')}")
-        st.write(f"**Telefone:** {ticket.get('buyer_phone', '-')}")
-        st.write(f"**Reservado em:** {ticket.get('reserved_at', '-')}")
+        if reused_from is not None:
+            st.warning(
+                "Este comprovante já foi enviado antes, na reserva "
+                f"**{reused_from or 'sem código'}**. Confira antes de confirmar."
+            )
+        st.write(f"**Nome:** {first.get('buyer_name', '-')}")
+        st.write(f"**Telefone:** {first.get('buyer_phone', '-')}")
+        st.write(f"**Reservado em:** {first.get('reserved_at', '-')}")
+        st.write(f"**Código:** {code or '-'}")
 
-        proof = ticket.get("proof_url")
+        proof = first.get("proof_url")
         if proof:
             st.image(proof, caption="Comprovante", use_container_width=True)
         else:
@@ -163,45 +255,103 @@ def _render_ticket_expander(ticket: dict) -> None:
 
         col_ok, col_no = st.columns(2)
         with col_ok:
-            if st.button("Confirmar", key=f"confirm_{ticket['number']}", use_container_width=True):
-                confirm_ticket(ticket["id"])
-                st.success(f"Número {format_number(ticket['number'])} confirmado!")
-                st.rerun()
+            st.button(
+                "Confirmar", key=f"confirm_{key}", use_container_width=True,
+                on_click=_confirm_reservations, args=(group,),
+            )
         with col_no:
-            if st.button(
-                "Rejeitar", key=f"reject_{ticket['number']}",
+            st.button(
+                "Rejeitar", key=f"reject_{key}",
                 type="secondary", use_container_width=True,
-            ):
-                reject_ticket(ticket["id"])
-                st.warning(f"Número {format_number(ticket['number'])} liberado.")
-                st.rerun()
+                on_click=_reject_reservations, args=(group,),
+            )
 
 
+@st.fragment
 def _tab_reservas(raffle: dict) -> None:
-    """Exibe e gerencia reservas pendentes."""
-    reserved = get_tickets_by_status(raffle["id"], "reserved")
+    """Exibe e gerencia reservas pendentes, uma página por vez.
+
+    Roda como fragmento: filtrar, paginar, confirmar ou rejeitar recarrega
+    só a página exibida, não o painel inteiro.
+    """
+    col_name, col_phone, col_age = st.columns(3)
+    buyer = col_name.text_input("Comprador", key="reservas_buyer")
+    phone = col_phone.text_input("Telefone", key="reservas_phone")
+    age = col_age.selectbox("Idade da reserva", list(_AGE_FILTERS), key="reservas_age")
+
+    # Pilha de cursores: o topo é o início da página atual (None = primeira).
+    filters = (raffle["id"], buyer, phone, age)
+    if st.session_state.get("reservas_filters") != filters:
+        st.session_state["reservas_filters"] = filters
+        st.session_state["reservas_cursors"] = [None]
+    cursors: list[str | None] = st.session_state["reservas_cursors"]
+
+    while True:
+        reserved, next_cursor = get_reservation_page(
+            raffle["id"],
+            after=cursors[-1],
+            buyer_name=buyer,
+            buyer_phone=phone,
+            older_than_minutes=_AGE_FILTERS[age],
+        )
+        if reserved or len(cursors) == 1:
+            break
+        # A página ficou vazia depois das ações: volta para a anterior.
+        cursors.pop()
 
+    flash = st.session_state.pop("reservas_flash", None)
+    if flash is not None:
+        kind, message = flash
+        getattr(st, kind)(message)
+
+    total = count_tickets_by_status(raffle["id"], "reserved")
     if not reserved:
-        st.info("Nenhuma reserva pendente.")
+        st.info("Nenhuma reserva pendente." if not total else "Nenhuma reserva encontrada.")
         return
 
-    st.markdown(f"**{len(reserved)}** reserva(s) pendente(s)")
+    groups = group_reservations(reserved)
+    st.markdown(
+        f"**{total}** número(s) reservado(s) no total — página {len(cursors)}: "
+        f"**{len(groups)}** reserva(s), {len(reserved)} número(s)"
+    )
 
     col_all_ok, col_all_no = st.columns(2)
     with col_all_ok:
-        if st.button("Confirmar todas", use_container_width=True, type="primary"):
-            count = confirm_tickets_bulk(reserved)
-            st.success(f"{count} reserva(s) confirmada(s)!")
-            st.rerun()
+        st.button(
+            "Confirmar página", use_container_width=True, type="primary",
+            on_click=_confirm_reservations, args=(reserved,),
+        )
     with col_all_no:
-        if st.button("Rejeitar todas", use_container_width=True, type="secondary"):
-            count = reject_tickets_bulk(reserved)
-            st.warning(f"{count} reserva(s) rejeitada(s).")
-            st.rerun()
+        st.button(
+            "Rejeitar página", use_container_width=True, type="secondary",
+            on_click=_reject_reservations, args=(reserved,),
+        )
+
+    origins = get_proof_origins([t["proof_hash"] for t in reserved if t.get("proof_hash")])
+    reused = {
+        id(group): origins[group[0]["proof_hash"]]
+        for group in groups
+        if group[0].get("proof_hash") in origins
+        and origins[group[0]["proof_hash"]] != group[0].get("reservation_code")
+    }
+    if reused:
+        st.warning(f"**{len(reused)}** reserva(s) com comprovante repetido nesta página.")
 
     st.divider()
-    for ticket in reserved:
-        _render_ticket_expander(ticket)
+    for group in groups:
+        _render_reservation_group(group, reused.get(id(group)))
+
+    col_prev, col_next = st.columns(2)
+    with col_prev:
+        st.button(
+            "← Anterior", disabled=len(cursors) == 1, use_container_width=True,
+            on_click=_previous_page,
+        )
+    with col_next:
+        st.button(
+            "Próxima →", disabled=next_cursor is None, use_container_width=True,
+            on_click=_next_page, args=(next_cursor,),
+        )
 
 
 with tab_reservas:
@@ -316,10 +466,62 @@ def _tab_visao(raffle: dict) -> None:
     progress = counts["confirmed"] / total if total > 0 else 0
     st.progress(progress, text=f"{counts['confirmed']}/{total} confirmados")
 
+    st.divider()
+    _render_sales_velocity(raffle)
+
     st.divider()
     _render_sales_table(all_tickets)
 
 
+def _render_sales_velocity(raffle: dict) -> None:
+    """Gráfico de vendas por hora e métricas do histórico de eventos."""
+    st.subheader("Velocidade de vendas")
+    st.caption(
+        "Movimentações dos últimos "
+        f"{get_setting('ROLLUP_SAFETY_LAG_SECONDS', 30.0):.0f} segundos "
+        "entram na próxima atualização."
+    )
+    rollup = refresh_sales_rollup(raffle["id"])
+    if not rollup.reserved and not rollup.confirmed:
+        st.info("Nenhuma movimentação registrada ainda.")
+        return
+
+    c1, c2 = st.columns(2)
+    mean_minutes = rollup.mean_confirmation_minutes
+    c1.metric(
+        "Tempo médio até confirmar",
+        f"{mean_minutes:.0f} min" if mean_minutes is not None else "-",
+    )
+    rate = rollup.rejection_rate
+    c2.metric("Taxa de rejeição", f"{rate:.0%}" if rate is not None else "-")
+
+    import pandas as pd
+
+    tz = get_setting("TIMEZONE", "America/Sao_Paulo")
+    hourly = pd.DataFrame(
+        {
+            "Reservados": pd.Series(rollup.reserved_per_hour, dtype="int64"),
+            "Confirmados": pd.Series(rollup.confirmed_per_hour, dtype="int64"),
+        }
+    ).fillna(0).astype("int64")
+    hourly.index = (
+        pd.to_datetime(hourly.index, format="%Y-%m-%dT%H", utc=True)
+        .tz_convert(tz)
+        .tz_localize(None)
+    )
+    st.bar_chart(hourly.sort_index(), stack=False)
+
+    if rollup.confirmation_histogram:
+        st.caption("Tempo entre reserva e confirmação")
+        st.bar_chart(
+            pd.Series(
+                {label: rollup.confirmation_histogram.get(label, 0)
+                 for _, label in CONFIRMATION_BUCKETS}
+            ),
+            horizontal=True,
+        )
+
+
 def _render_sales_table(all_tickets: list[dict]) -> None:
     """Exibe tabela de tickets vendidos/reservados."""
     sold = [t for t in all_tickets if t["status"] != "available"]
@@ -341,3 +543,51 @@ with tab_visao:
         st.warning("Crie uma rifa primeiro.")
     else:
         _tab_visao(raffle)
+
+
+# ── TAB: Histórico ───────────────────────────────────────────────────────────
+def _tab_historico() -> None:
+    """Arquivamento de rifas encerradas e resumos das já arquivadas."""
+    pending = get_unarchived_finished_raffles()
+    if pending:
+        st.markdown("**Encerradas, aguardando arquivamento**")
+        st.caption(
+            "Arquivar move os números da rifa para o arquivo e guarda um resumo; "
+            "a tabela usada pelas rifas em andamento fica menor."
+        )
+        for old in pending:
+            col_title, col_button = st.columns([3, 1])
+            col_title.write(f"{old['title']} — {old['total_numbers']} números")
+            if col_button.button(
+                "Arquivar", key=f"archive_{old['id']}", use_container_width=True
+            ):
+                summary = archive_raffle(old["id"])
+                st.success(
+                    f"Rifa arquivada: {summary['confirmed_count']} número(s) vendido(s)."
+                )
+                st.rerun()
+        st.divider()
+
+    summaries = get_raffle_summaries()
+    if not summaries:
+        st.info("Nenhuma rifa arquivada ainda.")
+        return
+
+    rows = []
+    for summary in summaries:
+        winner = summary.get("winner_number")
+        rows.append({
+            "Rifa": summary["title"],
+            "Vendidos": f"{summary['confirmed_count']}/{summary['total_numbers']}",
+            "Arrecadado": f"R$ {float(summary['revenue']):.2f}",
+            "Ganhador": (
+                f"{format_number(winner)} — {summary.get('winner_name') or '-'}"
+                if winner is not None else "-"
+            ),
+            "Arquivada em": summary["archived_at"][:10],
+        })
+    st.dataframe(rows, use_container_width=True, hide_index=True)
+
+
+with tab_historico:
+    _tab_historico()
@@ -0,0 +1,172 @@
+"""Verifica que nenhuma consulta dos serviços vira varredura completa.
+
+Sobe o backend local (`scripts/local_backend.py`), aplica os índices
+declarados em `migrations/` (os mesmos `create index`/`drop index`, traduzidos
+para SQLite), popula algumas rifas e executa cada função de serviço. Cada
+comando SQL gerado passa por `EXPLAIN QUERY PLAN`; a checagem falha se algum
+ler a tabela inteira — ou percorrer um índice inteiro tendo filtro.
+
+Uso:
+    python scripts/check_query_plans.py [--raffles 4] [--numbers 500] [--verbose]
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from collections.abc import Callable
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "scripts")]
+
+from local_backend import LocalBackend, install
+
+MIGRATIONS_DIR = ROOT / "migrations"
+_INDEX_DDL_RE = re.compile(r"^(create\s+(unique\s+)?index|drop\s+index)\b", re.I)
+
+
+def migration_indexes(directory: Path = MIGRATIONS_DIR) -> list[str]:
+    """Comandos de índice das migrações, em ordem, no dialeto do SQLite."""
+    statements = []
+    for path in sorted(directory.glob("*.sql")):
+        text = re.sub(r"--[^\n]*", "", path.read_text(encoding="utf-8"))
+        for statement in text.split(";"):
+            statement = " ".join(statement.split())
+            if _INDEX_DDL_RE.match(statement):
+                statement = statement.replace("public.", "")
+                statements.append(re.sub(r"\bconcurrently\s+", "", statement, flags=re.I))
+    return statements
+
+
+def _seed(backend: LocalBackend, raffles: int, numbers: int, history: int) -> dict:
+    """Popula rifas com reservas, confirmações e eventos; retorna a ativa.
+
+    Todas menos a última são encerradas, e a primeira é arquivada. Um
+    histórico de rifas antigas já arquivadas (sem tickets) dá ao planejador
+    a proporção real entre rifas ativas e encerradas.
+    """
+    from utils import raffle_service as rs
+    from utils.storage import store_proof
+
+    backend.conn.executemany(
+        "insert into raffles (id, title, total_numbers, status, archived_at, created_at)"
+        " values (?, 'Antiga', 100, 'finished', '2020-01-01', '2020-01-01')",
+        [(f"antiga-{i}",) for i in range(history)],
+    )
+    for i in range(raffles):
+        raffle = backend.seed_raffle(total_numbers=numbers)
+        for n in range(1, numbers // 2, 3):
+            code = f"R{i}N{n}"
+            proof = store_proof(raffle["id"], code, code.encode(), "c.png", "image/png")
+            rs.reserve_tickets(
+                raffle["id"], [n, n + 1], f"Comprador {n}", f"62{n:09d}",
+                proof.url, reservation_code=code, proof_hash=proof.sha256,
+            )
+        rs.confirm_tickets_bulk(rs.get_tickets_by_status(raffle["id"], "reserved")[::2])
+        if i < raffles - 1:
+            rs.set_winner(raffle["id"], 1)
+            if i == 0:
+                rs.archive_raffle(raffle["id"])
+    backend.conn.execute("analyze")
+    return raffle
+
+
+def _scenarios(raffle: dict) -> list[tuple[str, Callable[[], object]]]:
+    from utils import analytics
+    from utils import raffle_service as rs
+    from utils import storage
+
+    rid = raffle["id"]
+    reserved = rs.get_tickets_by_status(rid, "reserved")
+    code = reserved[0]["reservation_code"]
+    _, cursor = rs.get_reservation_page(rid, page_size=5)
+    return [
+        ("get_active_raffle", rs.get_active_raffle),
+        ("get_tickets", lambda: rs.get_tickets(rid, columns="number, status")),
+        ("get_tickets_by_status", lambda: rs.get_tickets_by_status(rid, "available")),
+        ("count_tickets_by_status", lambda: rs.count_tickets_by_status(rid, "reserved")),
+        ("get_reservation_page", lambda: rs.get_reservation_page(rid, page_size=5)),
+        ("get_reservation_page (cursor)",
+         lambda: rs.get_reservation_page(rid, after=cursor, page_size=5)),
+        ("get_reservation_page (filtros)",
+         lambda: rs.get_reservation_page(
+             rid, buyer_name="comprador", buyer_phone="62", older_than_minutes=1)),
+        ("get_reservation_numbers", lambda: rs.get_reservation_numbers(rid, code)),
+        ("get_tickets_by_phone",
+         lambda: rs.get_tickets_by_phone(rid, reserved[0]["buyer_phone"], code)),
+        ("reserve_tickets",
+         lambda: rs.reserve_tickets(rid, [raffle["total_numbers"]], "X", "62", "u", "PLAN")),
+        ("confirm_tickets_bulk", lambda: rs.confirm_tickets_bulk(reserved[:2])),
+        ("reject_tickets_bulk", lambda: rs.reject_tickets_bulk(reserved[2:4])),
+        ("confirm_ticket_manual",
+         lambda: rs.confirm_ticket_manual(rid, raffle["total_numbers"] - 1, "Y", "62")),
+        ("get_winner_ticket", lambda: rs.get_winner_ticket(rid, 1)),
+        ("get_unarchived_finished_raffles", rs.get_unarchived_finished_raffles),
+        ("get_raffle_summaries", rs.get_raffle_summaries),
+        ("refresh_sales_rollup", lambda: analytics.refresh_sales_rollup(rid)),
+        ("get_proof_origins",
+         lambda: storage.get_proof_origins([t["proof_hash"] for t in reserved[:5]])),
+        ("store_proof", lambda: storage.store_proof(rid, "PLAN", b"novo", "n.png", None)),
+    ]
+
+
+def _problems(sql: str, plan: list[str]) -> list[str]:
+    """Passos do plano que leem uma tabela (ou índice filtrado) inteira."""
+    has_filter = " where " in sql.lower()
+    problems = []
+    for detail in plan:
+        if not detail.startswith("SCAN "):
+            continue
+        if "USING" not in detail or has_filter:
+            problems.append(detail)
+    return problems
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--raffles", type=int, default=4)
+    parser.add_argument("--numbers", type=int, default=500)
+    parser.add_argument("--history", type=int, default=200,
+                        help="rifas antigas já arquivadas no banco")
+    parser.add_argument("--verbose", action="store_true", help="mostra todos os planos")
+    args = parser.parse_args()
+
+    backend = LocalBackend()
+    for statement in migration_indexes():
+        backend.conn.execute(statement)
+    install(backend)
+    raffle = _seed(backend, args.raffles, args.numbers, args.history)
+
+    failures = 0
+    for name, run in _scenarios(raffle):
+        backend.statements.clear()
+        run()
+        statements = [(sql, p) for sql, p in backend.statements
+                      if not sql.lstrip().lower().startswith("insert")]
+        failed = 0
+        for sql, params in statements:
+            plan = [row["detail"] for row in
+                    backend.conn.execute(f"explain query plan {sql}", params)]
+            problems = _problems(sql, plan)
+            failed += bool(problems)
+            if problems or args.verbose:
+                print(f"{name}: {'FALHA' if problems else 'ok'}")
+                print(f"    {sql}")
+                for detail in plan:
+                    print(f"    -> {detail}")
+        if not failed and not args.verbose:
+            print(f"{name:<34} ok ({len(statements)} consulta(s))")
+        failures += failed
+
+    print()
+    if failures:
+        print(f"FALHA: {failures} consulta(s) com varredura completa.")
+        return 1
+    print("OK: todas as consultas usam índice.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,264 @@
+"""Teste de carga da página pública com compradores simultâneos.
+
+Cada comprador simulado é uma sessão `AppTest` que abre `app.py`, escolhe
+números de um conjunto "quente" (para forçar disputa), preenche o formulário,
+anexa um comprovante e envia. O Supabase é substituído pelo backend local
+(`scripts/local_backend.py`), com latência configurável.
+
+O `AppTest` não é thread-safe, então cada execução do script é serializada;
+os compradores se intercalam entre os passos (vendo a grade desatualizada,
+como na vida real), enquanto a fila de reservas e o backend rodam de fato
+em paralelo.
+
+Relata latência do envio (p50/p95/p99), latência até a reserva concluída,
+chamadas ao backend por reserva e vazão. Também verifica a corretude:
+
+- nenhum número pode ser entregue a duas reservas;
+- nenhum comprador pode ver "sucesso" para um número que não ficou com ele.
+
+Sai com código 1 se alguma verificação falhar.
+
+Uso:
+    python scripts/loadtest.py --buyers 300 --concurrency 30 --hot 40
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import re
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT), str(ROOT / "scripts")]
+
+from local_backend import LocalBackend, install
+
+_APPTEST_LOCK = threading.Lock()
+_SUCCESS_RE = re.compile(r"Número\(s\) \*\*([\d, ]+)\*\* reservado\(s\) com sucesso")
+
+
+@dataclass
+class BuyerResult:
+    """O que aconteceu com um comprador simulado."""
+
+    phone: str
+    wanted: list[int]
+    submit_seconds: float = 0.0
+    code: str | None = None
+    told_success: list[int] = field(default_factory=list)
+    errors: list[str] = field(default_factory=list)
+    app: object = field(default=None, repr=False)
+
+
+def _percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, round(pct / 100 * (len(ordered) - 1)))
+    return ordered[index]
+
+
+def _by_label(widgets, label: str):
+    return next((w for w in widgets if w.label == label), None)
+
+
+def _run(at, action=None):
+    """Executa um rerun da sessão (ações de widget + script) sob o lock."""
+    with _APPTEST_LOCK:
+        started = time.perf_counter()
+        (action or at).run()
+        return time.perf_counter() - started
+
+
+def _simulate_buyer(index: int, hot: list[int], picks: int, seed: int) -> BuyerResult:
+    from streamlit.testing.v1 import AppTest
+
+    rng = random.Random(seed + index)
+    phone = f"62{90000000 + index:08d}"
+    at = AppTest.from_file(str(ROOT / "app.py"), default_timeout=120)
+    _run(at)
+
+    options = list(at.multiselect[0].options) if at.multiselect else []
+    hot_options = [o for o in options if int(o) in hot] or options
+    wanted = sorted(rng.sample(hot_options, min(picks, len(hot_options))))
+    result = BuyerResult(phone, [int(o) for o in wanted])
+    if not wanted:
+        result.errors.append("nenhum número disponível na página")
+        return result
+
+    _run(at, at.multiselect[0].set_value(wanted))
+    name_input = _by_label(at.text_input, "Seu nome completo")
+    if name_input is None:
+        # A grade mudou entre a escolha e o rerun (números tomados ou dados
+        # desatualizados) e o formulário não apareceu.
+        result.errors.append("formulário indisponível após escolher os números")
+        return result
+    name_input.input(f"Comprador {index}")
+    _by_label(at.text_input, "Telefone com DDD").input(phone)
+    at.file_uploader[0].set_value(
+        (f"comprovante-{index}.png", os.urandom(2048), "image/png")
+    )
+    result.submit_seconds = _run(at, _by_label(at.button, "Enviar e reservar").click())
+
+    result.errors.extend(e.value for e in at.error)
+    result.errors.extend(w.value for w in at.warning if "Muitas tentativas" in w.value)
+    codes = at.session_state["my_submissions"] if "my_submissions" in at.session_state else []
+    result.code = codes[-1] if codes else None
+    if result.code is None and not result.errors:
+        result.errors.extend(w.value for w in at.warning)
+        result.errors.extend(f"exceção: {e.message}" for e in at.exception)
+        if not result.errors and not (at.multiselect and at.multiselect[0].value):
+            # Os números escolhidos saíram das opções antes do envio e o
+            # Streamlit descartou a seleção: o clique não faz nada.
+            result.errors.append("seleção descartada no envio (números tomados)")
+        elif not result.errors:
+            result.errors.append("envio sem código e sem mensagem de erro")
+    result.app = at  # reaproveitada para ler a mensagem final
+    return result
+
+
+def _wait_for_queue(codes: list[str], timeout: float) -> dict[str, object]:
+    from utils.submission_queue import get_submission_queue
+
+    queue = get_submission_queue()
+    deadline = time.monotonic() + timeout
+    while True:
+        subs = {code: queue.get(code) for code in codes}
+        if all(s.status in ("done", "failed") for s in subs.values()):
+            return subs
+        if time.monotonic() > deadline:
+            return subs
+        time.sleep(0.2)
+
+
+def run(args: argparse.Namespace) -> int:
+    tmp = tempfile.mkdtemp(prefix="rifa-loadtest-")
+    os.environ.update(
+        SUBMISSION_QUEUE_PATH=str(Path(tmp) / "submissions.db"),
+        SNAPSHOT_PATH=str(Path(tmp) / "snapshot.json.gz"),
+        SUBMISSION_WORKERS=str(args.workers),
+    )
+
+    backend = LocalBackend(latency=args.latency_ms / 1000)
+    raffle = backend.seed_raffle(total_numbers=args.numbers)
+    install(backend)
+    hot = list(range(1, min(args.hot, args.numbers) + 1))
+
+    print(
+        f"Rifa com {args.numbers} números, {len(hot)} quentes; "
+        f"{args.buyers} compradores ({args.concurrency} simultâneos), "
+        f"{args.picks} número(s) cada, latência simulada {args.latency_ms} ms"
+    )
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(
+            lambda i: _simulate_buyer(i, hot, args.picks, args.seed),
+            range(args.buyers),
+        ))
+    submitted = time.perf_counter() - started
+
+    codes = [r.code for r in results if r.code]
+    subs = _wait_for_queue(codes, timeout=args.drain_timeout)
+    elapsed = time.perf_counter() - started
+
+    # Recarrega cada sessão para ler o que a página diz ao comprador.
+    for r in results:
+        if r.code:
+            _run(r.app)
+            for msg in r.app.success:
+                match = _SUCCESS_RE.search(msg.value)
+                if match:
+                    r.told_success = [int(n) for n in match.group(1).split(", ")]
+
+    rows = backend.table("tickets").select("number, reservation_code") \
+        .eq("raffle_id", raffle["id"]).execute().data
+    holder = {row["number"]: row["reservation_code"] for row in rows}
+    false_success = [
+        (r.code, n) for r in results for n in r.told_success if holder.get(n) != r.code
+    ]
+    double_booked = backend.double_booked()
+    done = [s for s in subs.values() if s.status == "done"]
+    failed = [s for s in subs.values() if s.status == "failed"]
+    unfinished = len(subs) - len(done) - len(failed)
+    reserved_total = sum(len(s.reserved_numbers or []) for s in done)
+
+    submit_lat = [r.submit_seconds for r in results if r.code]
+    e2e_lat = [s.updated_at - s.created_at for s in done]
+    backend_calls = sum(backend.calls.values())
+
+    print()
+    print(f"Envios aceitos:          {len(codes)}/{args.buyers}")
+    print(f"Reservas concluídas:     {len(done)} (falhas: {len(failed)}, "
+          f"pendentes: {unfinished})")
+    print(f"Números reservados:      {reserved_total}")
+    for name, values in (("Envio (clique→código)", submit_lat),
+                         ("Fim a fim (fila→reserva)", e2e_lat)):
+        print(
+            f"{name:<25}p50 {_percentile(values, 50) * 1000:7.0f} ms  "
+            f"p95 {_percentile(values, 95) * 1000:7.0f} ms  "
+            f"p99 {_percentile(values, 99) * 1000:7.0f} ms"
+        )
+    print(f"Vazão:                   {len(done) / elapsed:.1f} reservas/s "
+          f"(envios: {len(codes) / submitted:.1f}/s)")
+    per_reservation = backend_calls / max(len(done), 1)
+    print(f"Chamadas ao backend:     {backend_calls} "
+          f"({per_reservation:.1f} por reserva concluída)")
+    for name, count in backend.calls.most_common():
+        print(f"    {name:<28}{count}")
+    rejected = [r for r in results if r.errors]
+    if rejected:
+        print(f"Compradores sem reserva: {len(rejected)}")
+        for reason, count in Counter(r.errors[0] for r in rejected).most_common():
+            print(f"    {count:>4} × {reason}")
+
+    print()
+    ok = True
+    if double_booked:
+        ok = False
+        print(f"FALHA: {len(double_booked)} número(s) entregue(s) a duas reservas:")
+        for (_, number), history in sorted(double_booked.items())[:10]:
+            print(f"    {number:02d}: {history}")
+    if false_success:
+        ok = False
+        print(f"FALHA: {len(false_success)} 'sucesso' para número que não ficou "
+              "com o comprador:")
+        for code, number in false_success[:10]:
+            print(f"    reserva {code}: número {number:02d} (dono: {holder.get(number)})")
+    if unfinished:
+        ok = False
+        print(f"FALHA: {unfinished} reserva(s) não concluída(s) em "
+              f"{args.drain_timeout:.0f}s")
+    if ok:
+        print("OK: nenhuma reserva dupla e nenhum 'sucesso' indevido.")
+    return 0 if ok else 1
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--buyers", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--numbers", type=int, default=100)
+    parser.add_argument("--hot", type=int, default=30,
+                        help="quantos números (a partir do 1) os compradores disputam")
+    parser.add_argument("--picks", type=int, default=3)
+    parser.add_argument("--latency-ms", type=float, default=30.0,
+                        help="latência simulada por chamada ao backend")
+    parser.add_argument("--workers", type=int, default=2,
+                        help="threads que drenam a fila de reservas")
+    parser.add_argument("--drain-timeout", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=42)
+    return run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
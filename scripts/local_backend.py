@@ -0,0 +1,544 @@
+"""Backend local que imita o cliente Supabase usado pela aplicação.
+
+Implementa o subconjunto da API do `supabase-py` que `utils/` usa
+(`table(...).select/insert/update/delete` com filtros, `order`, `limit`,
+`rpc` para as funções de `migrations/` e o Storage), sobre um SQLite
+em memória. Serve para exercitar as páginas e os
+serviços sem rede: harness de carga, checagens de plano de consulta etc.
+
+    backend = LocalBackend(latency=0.02)
+    raffle = backend.seed_raffle(total_numbers=100)
+    install(backend)  # troca os clientes Supabase em todos os módulos de utils
+"""
+
+from __future__ import annotations
+
+import json
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, defaultdict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Any
+
+_SCHEMA = """
+create table raffles (
+    id text primary key,
+    title text not null,
+    description text default '',
+    total_numbers integer not null,
+    price real not null default 10.0,
+    pix_key text not null default '',
+    pix_name text not null default '',
+    status text not null default 'active',
+    winner_number integer,
+    archived_at text,
+    created_at text not null
+);
+create table tickets (
+    id text primary key,
+    raffle_id text not null references raffles(id) on delete cascade,
+    number integer not null,
+    status text not null default 'available',
+    buyer_name text,
+    buyer_phone text,
+    proof_url text,
+    proof_hash text,
+    reservation_code text,
+    reserved_at text,
+    confirmed_at text,
+    unique (raffle_id, number)
+);
+create table proof_hashes (
+    sha256 text primary key,
+    path text not null,
+    first_raffle_id text,
+    first_reservation_code text,
+    created_at text not null
+);
+create table ticket_events (
+    id integer primary key autoincrement,
+    raffle_id text not null references raffles(id) on delete cascade,
+    ticket_number integer not null,
+    event_type text not null,
+    buyer_name text,
+    buyer_phone text,
+    reservation_code text,
+    created_at text not null
+);
+-- Mesmo papel do trigger log_ticket_event de migrations/; created_at no
+-- formato de _now_iso().
+create trigger trg_tickets_log_event after update of status on tickets
+when old.status is not new.status
+    and new.status in ('reserved', 'confirmed', 'available')
+begin
+    insert into ticket_events (
+        raffle_id, ticket_number, event_type, buyer_name, buyer_phone,
+        reservation_code, created_at
+    ) values (
+        new.raffle_id, new.number,
+        case new.status when 'available' then 'rejected' else new.status end,
+        case new.status when 'available' then old.buyer_name else new.buyer_name end,
+        case new.status when 'available' then old.buyer_phone else new.buyer_phone end,
+        case new.status when 'available' then old.reservation_code
+            else new.reservation_code end,
+        strftime('%Y-%m-%dT%H:%M:%f000+00:00', 'now')
+    );
+end;
+create table ticket_event_rollups (
+    raffle_id text primary key references raffles(id) on delete cascade,
+    last_event_at text,
+    state text not null default '{}',
+    updated_at text
+);
+create table raffle_summaries (
+    raffle_id text primary key references raffles(id) on delete cascade,
+    title text not null,
+    total_numbers integer not null,
+    price real not null,
+    confirmed_count integer not null,
+    reserved_count integer not null,
+    revenue real not null,
+    winner_number integer,
+    winner_name text,
+    created_at text not null,
+    archived_at text not null
+);
+create table tickets_archive (
+    raffle_id text primary key references raffles(id) on delete cascade,
+    tickets text not null default '[]'
+);
+"""
+
+# Colunas jsonb no Postgres: gravadas como texto JSON e decodificadas na leitura.
+_JSON_COLUMNS = {"state", "tickets"}
+
+_OPERATORS = {
+    "eq": "=", "neq": "!=", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=",
+    "like": "like", "ilike": "like",
+}
+
+
+@dataclass
+class _Response:
+    data: list[dict[str, Any]]
+    count: int | None = None
+
+
+class _Query:
+    """Construtor de consulta no estilo postgrest-py."""
+
+    def __init__(self, backend: LocalBackend, table: str) -> None:
+        self._backend = backend
+        self.table = table
+        self.op = "select"
+        self.columns = "*"
+        self.payload: Any = None
+        self.filters: list[tuple[str, str, Any]] = []
+        self.orders: list[tuple[str, bool]] = []
+        self.limit_n: int | None = None
+        self.offset_n: int | None = None
+        self.count: str | None = None
+        self.head = False
+
+    # ── Operações ────────────────────────────────────────────────────────────
+
+    def select(
+        self, columns: str = "*", count: str | None = None, head: bool = False
+    ) -> _Query:
+        self.op, self.columns = "select", columns
+        self.count, self.head = count, head
+        return self
+
+    def insert(self, rows: dict | list[dict]) -> _Query:
+        self.op, self.payload = "insert", rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(
+        self,
+        rows: dict | list[dict],
+        on_conflict: str = "",
+        ignore_duplicates: bool = False,
+    ) -> _Query:
+        self.op = "upsert"
+        self.payload = rows if isinstance(rows, list) else [rows]
+        self.on_conflict, self.ignore_duplicates = on_conflict, ignore_duplicates
+        return self
+
+    def update(self, values: dict) -> _Query:
+        self.op, self.payload = "update", values
+        return self
+
+    def delete(self) -> _Query:
+        self.op = "delete"
+        return self
+
+    # ── Filtros e modificadores ──────────────────────────────────────────────
+
+    def _filter(self, column: str, op: str, value: Any) -> _Query:
+        self.filters.append((column, op, value))
+        return self
+
+    def eq(self, column: str, value: Any) -> _Query:
+        return self._filter(column, "eq", value)
+
+    def neq(self, column: str, value: Any) -> _Query:
+        return self._filter(column, "neq", value)
+
+    def gt(self, column: str, value: Any) -> _Query:
+        return self._filter(column, "gt", value)
+
+    def gte(self, column: str, value: Any) -> _Query:
+        return self._filter(column, "gte", value)
+
+    def lt(self, column: str, value: Any) -> _Query:
+        return self._filter(column, "lt", value)
+
+    def lte(self, column: str, value: Any) -> _Query:
+        return self._filter(column, "lte", value)
+
+    def like(self, column: str, pattern: str) -> _Query:
+        return self._filter(column, "like", pattern.replace("*", "%"))
+
+    def ilike(self, column: str, pattern: str) -> _Query:
+        return self._filter(column, "ilike", pattern.replace("*", "%"))
+
+    def in_(self, column: str, values: list[Any]) -> _Query:
+        return self._filter(column, "in", list(values))
+
+    def is_(self, column: str, value: str | None) -> _Query:
+        return self._filter(column, "is", value)
+
+    def order(self, column: str, desc: bool = False) -> _Query:
+        self.orders.append((column, desc))
+        return self
+
+    def limit(self, n: int) -> _Query:
+        self.limit_n = n
+        return self
+
+    def range(self, start: int, end: int) -> _Query:
+        self.offset_n, self.limit_n = start, end - start + 1
+        return self
+
+    def execute(self) -> _Response:
+        return self._backend.execute(self)
+
+
+class _Rpc:
+    """Chamada de função do banco (`client.rpc(nome, params)`)."""
+
+    def __init__(self, backend: LocalBackend, name: str, params: dict) -> None:
+        self._backend = backend
+        self.name, self.params = name, params
+
+    def execute(self) -> _Response:
+        self._backend.request(f"rpc.{self.name}")
+        function = getattr(self._backend, f"_rpc_{self.name}")
+        with self._backend.lock:
+            rows = function(**self.params)
+            self._backend.conn.commit()
+        return _Response([_from_sql(row) for row in rows])
+
+
+class _StorageError(Exception):
+    """Mesmos atributos do `StorageApiError` do supabase-py."""
+
+    def __init__(self, message: str, code: str, status: int) -> None:
+        super().__init__(f"{{'statusCode': {status}, 'error': {code}, 'message': {message}}}")
+        self.message, self.code, self.status = message, code, status
+
+
+class _Bucket:
+    def __init__(self, backend: LocalBackend, name: str) -> None:
+        self._backend = backend
+        self._name = name
+
+    def upload(self, path: str, data: bytes, file_options: dict | None = None) -> dict:
+        upsert = str((file_options or {}).get("upsert", "false")).lower() == "true"
+        self._backend.request(f"storage.{self._name}.upload")
+        with self._backend.lock:
+            key = (self._name, path)
+            if key in self._backend.objects and not upsert:
+                raise _StorageError("The resource already exists", "Duplicate", 409)
+            self._backend.objects[key] = bytes(data)
+        return {"path": path}
+
+    def get_public_url(self, path: str) -> str:
+        return f"https://local.invalid/storage/v1/object/public/{self._name}/{path}"
+
+
+class _Storage:
+    def __init__(self, backend: LocalBackend) -> None:
+        self._backend = backend
+
+    def from_(self, bucket: str) -> _Bucket:
+        return _Bucket(self._backend, bucket)
+
+
+class LocalBackend:
+    """Stand-in do Supabase: SQLite em memória + Storage em dicionário."""
+
+    def __init__(self, latency: float = 0.0, schema: str = _SCHEMA) -> None:
+        self.latency = latency
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(":memory:", check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.executescript(schema)
+        self.storage = _Storage(self)
+        self.objects: dict[tuple[str, str], bytes] = {}
+        self.calls: Counter[str] = Counter()
+        self.statements: list[tuple[str, list[Any]]] = []
+        # (raffle_id, number) → códigos de reserva que receberam o número,
+        # na ordem. Liberações registram None.
+        self.grants: dict[tuple[str, int], list[str | None]] = defaultdict(list)
+
+    # ── API do cliente ───────────────────────────────────────────────────────
+
+    def table(self, name: str) -> _Query:
+        return _Query(self, name)
+
+    def rpc(self, name: str, params: dict | None = None) -> _Rpc:
+        return _Rpc(self, name, params or {})
+
+    def request(self, name: str) -> None:
+        """Contabiliza uma chamada e simula a latência de rede."""
+        with self.lock:
+            self.calls[name] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def execute(self, query: _Query) -> _Response:
+        self.request(f"{query.table}.{query.op}")
+        with self.lock:
+            if query.op in ("insert", "upsert"):
+                rows = [self._insert(query, row) for row in query.payload]
+                rows = [row for row in rows if row is not None]
+            else:
+                sql, params = self.compile(query)
+                self.statements.append((sql, params))
+                rows = [dict(r) for r in self.conn.execute(sql, params).fetchall()]
+            self.conn.commit()
+            if query.table == "tickets" and query.op == "update":
+                self._record_grants(query.payload, rows)
+        count = len(rows) if query.count else None
+        if query.head:
+            rows = []
+        return _Response([_from_sql(row) for row in rows], count)
+
+    # ── Tradução para SQL ────────────────────────────────────────────────────
+
+    def compile(self, query: _Query) -> tuple[str, list[Any]]:
+        """Traduz a consulta para SQL parametrizado (select/update/delete)."""
+        params: list[Any] = []
+        where = self._where(query.filters, params)
+        if query.op == "select":
+            sql = f"select {self._columns(query.columns)} from {query.table}{where}"
+            if query.orders:
+                sql += " order by " + ", ".join(
+                    f"{col} {'desc' if desc else 'asc'}" for col, desc in query.orders
+                )
+            if query.limit_n is not None:
+                sql += f" limit {int(query.limit_n)}"
+                if query.offset_n:
+                    sql += f" offset {int(query.offset_n)}"
+            return sql, params
+        if query.op == "update":
+            assignments = ", ".join(f"{col} = ?" for col in query.payload)
+            values = [_to_sql(v) for v in query.payload.values()]
+            return (
+                f"update {query.table} set {assignments}{where} returning *",
+                values + params,
+            )
+        if query.op == "delete":
+            return f"delete from {query.table}{where} returning *", params
+        raise ValueError(f"Operação não suportada: {query.op}")
+
+    @staticmethod
+    def _columns(columns: str) -> str:
+        names = [c.strip() for c in columns.split(",") if c.strip()]
+        return "*" if names in ([], ["*"]) else ", ".join(names)
+
+    @staticmethod
+    def _where(filters: list[tuple[str, str, Any]], params: list[Any]) -> str:
+        clauses = []
+        for column, op, value in filters:
+            if op == "in":
+                clauses.append(f"{column} in ({', '.join('?' * len(value))})")
+                params.extend(_to_sql(v) for v in value)
+            elif op == "is":
+                clauses.append(f"{column} is null" if value in (None, "null")
+                               else f"{column} is not null")
+            else:
+                clauses.append(f"{column} {_OPERATORS[op]} ?")
+                params.append(_to_sql(value))
+        return " where " + " and ".join(clauses) if clauses else ""
+
+    def _insert(self, query: _Query, row: dict[str, Any]) -> dict[str, Any] | None:
+        table, row = query.table, dict(row)
+        columns = {r["name"]: r for r in self.conn.execute(f"pragma table_info({table})")}
+        if "id" in columns and columns["id"]["type"] == "TEXT":
+            row.setdefault("id", str(uuid.uuid4()))
+        if "created_at" in columns:
+            row.setdefault("created_at", _now_iso())
+        names = ", ".join(row)
+        placeholders = ", ".join("?" * len(row))
+        sql = f"insert into {table} ({names}) values ({placeholders})"
+        if query.op == "upsert":
+            target = query.on_conflict or "id"
+            if query.ignore_duplicates:
+                sql += f" on conflict ({target}) do nothing"
+            else:
+                updates = ", ".join(f"{c} = excluded.{c}" for c in row if c != target)
+                sql += f" on conflict ({target}) do update set {updates}"
+        sql += " returning *"
+        params = [_to_sql(v) for v in row.values()]
+        self.statements.append((sql, params))
+        result = self.conn.execute(sql, params).fetchone()
+        return dict(result) if result is not None else None
+
+    def _record_grants(self, values: dict[str, Any], rows: list[dict]) -> None:
+        if "status" not in values:
+            return
+        for row in rows:
+            key = (row["raffle_id"], row["number"])
+            if values["status"] == "reserved":
+                self.grants[key].append(row.get("reservation_code") or row["id"])
+            elif values["status"] == "available":
+                self.grants[key].append(None)
+
+    # ── Funções do banco ─────────────────────────────────────────────────────
+    # Mesma lógica das funções plpgsql de migrations/.
+
+    def _rpc_archive_raffle(self, p_raffle_id: str) -> list[dict[str, Any]]:
+        raffle = self.conn.execute(
+            "select * from raffles where id = ?", (p_raffle_id,)
+        ).fetchone()
+        if raffle is None:
+            raise RuntimeError(f"Rifa {p_raffle_id} nao encontrada")
+        if raffle["status"] != "finished":
+            raise RuntimeError("Apenas rifas encerradas podem ser arquivadas")
+        if raffle["archived_at"] is None:
+            now = _now_iso()
+            self.conn.execute(
+                """
+                insert into raffle_summaries
+                select r.id, r.title, r.total_numbers, r.price,
+                    count(t.id) filter (where t.status = 'confirmed'),
+                    count(t.id) filter (where t.status = 'reserved'),
+                    r.price * count(t.id) filter (where t.status = 'confirmed'),
+                    r.winner_number,
+                    max(t.buyer_name) filter (where t.number = r.winner_number),
+                    r.created_at, ?
+                from raffles r left join tickets t on t.raffle_id = r.id
+                where r.id = ?
+                """,
+                (now, p_raffle_id),
+            )
+            self.conn.execute(
+                """
+                insert into tickets_archive
+                select ?, coalesce(json_group_array(json_array(
+                    number, status, buyer_name, buyer_phone,
+                    reservation_code, confirmed_at
+                )), '[]')
+                from (select * from tickets
+                      where raffle_id = ? and status != 'available'
+                      order by number)
+                """,
+                (p_raffle_id, p_raffle_id),
+            )
+            self.conn.execute("delete from tickets where raffle_id = ?", (p_raffle_id,))
+            self.conn.execute(
+                "update raffles set archived_at = ? where id = ?", (now, p_raffle_id)
+            )
+        return [dict(r) for r in self.conn.execute(
+            "select * from raffle_summaries where raffle_id = ?", (p_raffle_id,)
+        )]
+
+    # ── Utilidades ───────────────────────────────────────────────────────────
+
+    def seed_raffle(self, total_numbers: int = 100, price: float = 10.0) -> dict:
+        """Cria uma rifa ativa com todos os números disponíveis."""
+        raffle = self.table("raffles").insert(
+            {"title": "Rifa de teste", "total_numbers": total_numbers,
+             "price": price, "pix_key": "teste@example.com", "pix_name": "Teste"}
+        ).execute().data[0]
+        self.table("tickets").insert(
+            [{"raffle_id": raffle["id"], "number": n} for n in range(1, total_numbers + 1)]
+        ).execute()
+        self.calls.clear()
+        return raffle
+
+    def double_booked(self) -> dict[tuple[str, int], list[str | None]]:
+        """Números entregues a uma segunda reserva sem terem sido liberados."""
+        result = {}
+        for key, history in self.grants.items():
+            holder = None
+            for code in history:
+                if code is not None and holder is not None and code != holder:
+                    result[key] = history
+                    break
+                holder = code
+        return result
+
+
+class _LocalClientPool:
+    """Pool de clientes autenticados de mentira: toda sessão usa o backend."""
+
+    def __init__(self, backend: LocalBackend) -> None:
+        self.backend = backend
+
+    def sign_in(self, email: str, password: str) -> str:
+        return "local"
+
+    def get(self, key: str | None) -> LocalBackend | None:
+        return self.backend if key is not None else None
+
+    def sign_out(self, key: str | None) -> None:
+        pass
+
+    def stats(self) -> dict[str, int]:
+        return {"em uso": 0, "livres": 0}
+
+
+def install(backend: LocalBackend) -> None:
+    """Faz os clientes Supabase retornarem o backend local em todos os módulos.
+
+    Troca `get_supabase`, `current_client` e `get_client_pool`; módulos
+    importados depois herdam o backend via `utils.supabase_client`.
+    """
+    import utils.supabase_client
+
+    pool = _LocalClientPool(backend)
+    replacements = {
+        "get_supabase": lambda: backend,
+        "current_client": lambda: backend,
+        "get_client_pool": lambda: pool,
+    }
+    modules = [utils.supabase_client] + [
+        module for name, module in list(sys.modules.items())
+        if name.startswith("utils") and module is not None
+    ]
+    for module in modules:
+        for attr, replacement in replacements.items():
+            if hasattr(module, attr):
+                setattr(module, attr, replacement)
+
+
+def _to_sql(value: Any) -> Any:
+    return json.dumps(value) if isinstance(value, (dict, list)) else value
+
+
+def _from_sql(row: dict[str, Any]) -> dict[str, Any]:
+    for column in _JSON_COLUMNS & row.keys():
+        if isinstance(row[column], str):
+            row[column] = json.loads(row[column])
+    return row
+
+
+def _now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
@@ -0,0 +1,86 @@
+"""Mede o custo de importação das páginas e verifica o orçamento de startup.
+
+Para cada página, lê os imports de topo do arquivo e os executa num
+interpretador novo (várias vezes, usando a mediana). Falha se o tempo passar
+do orçamento ou se algum módulo pesado que deveria ser importado sob demanda
+(supabase, pandas, Pillow, qrcode) for carregado já na importação.
+
+Uso:
+    python scripts/measure_startup.py [--budget-ms 1500] [--runs 5]
+"""
+
+from __future__ import annotations
+
+import argparse
+import ast
+import json
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+PAGES = ("app.py", "pages/2_admin.py")
+# Módulos que só devem ser carregados quando realmente usados.
+DEFERRED = ("supabase", "pandas", "PIL", "qrcode")
+
+_PROBE = """
+import importlib, json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    importlib.import_module(name)
+elapsed = (time.perf_counter() - start) * 1000
+loaded = [m for m in {deferred!r} if m in sys.modules]
+print(json.dumps({{"ms": elapsed, "loaded": loaded}}))
+"""
+
+
+def top_level_imports(path: Path) -> list[str]:
+    """Módulos importados no nível de módulo de uma página."""
+    tree = ast.parse(path.read_text(encoding="utf-8"))
+    modules: list[str] = []
+    for node in tree.body:
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and node.level == 0:
+            if node.module != "__future__":
+                modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def measure(page: str, runs: int) -> tuple[float, list[str]]:
+    """Retorna a mediana (ms) e os módulos adiados que foram carregados."""
+    modules = top_level_imports(ROOT / page)
+    probe = _PROBE.format(modules=modules, deferred=DEFERRED)
+    timings, loaded = [], set()
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", probe],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        )
+        result = json.loads(out.stdout.strip().splitlines()[-1])
+        timings.append(result["ms"])
+        loaded.update(result["loaded"])
+    return statistics.median(timings), sorted(loaded)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=1500.0)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    ok = True
+    for page in PAGES:
+        median_ms, loaded = measure(page, args.runs)
+        status = "ok"
+        if median_ms > args.budget_ms:
+            status, ok = "ACIMA DO ORÇAMENTO", False
+        if loaded:
+            status, ok = f"carregou {', '.join(loaded)} na importação", False
+        print(f"{page:<20} {median_ms:8.1f} ms  (orçamento {args.budget_ms:.0f} ms)  {status}")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
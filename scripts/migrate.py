@@ -0,0 +1,131 @@
+"""Aplica as migrações de `migrations/` no Postgres do Supabase, em ordem.
+
+Cada arquivo `NNNN_descricao.sql` roda uma única vez, numa transação, e fica
+registrado em `public.schema_migrations`. Usa a connection string do banco
+(Supabase: Settings > Database) e o psycopg, que não faz parte do app:
+
+    pip install "psycopg[binary]"
+    DATABASE_URL=postgresql://... python scripts/migrate.py [--list]
+
+A 0001 é exatamente o antigo `supabase_setup.sql`: bancos criados com ele
+já têm esse esquema. Marque-a como aplicada antes da primeira execução com
+`--baseline 0001`; as demais migrações trazem o que veio depois.
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+import sys
+from dataclasses import dataclass
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+MIGRATIONS_DIR = ROOT / "migrations"
+_FILENAME_RE = re.compile(r"^(\d{4})_[a-z0-9_]+\.sql$")
+
+_CREATE_TABLE = """
+create table if not exists public.schema_migrations (
+    version text primary key,
+    name text not null,
+    applied_at timestamptz not null default now()
+)
+"""
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    path: Path
+
+    @property
+    def name(self) -> str:
+        return self.path.stem
+
+    def sql(self) -> str:
+        return self.path.read_text(encoding="utf-8")
+
+
+def discover(directory: Path = MIGRATIONS_DIR) -> list[Migration]:
+    """Migrações do diretório, ordenadas pela versão."""
+    migrations = []
+    for path in sorted(directory.glob("*.sql")):
+        match = _FILENAME_RE.match(path.name)
+        if match is None:
+            raise SystemExit(f"Nome de migração inválido: {path.name}")
+        migrations.append(Migration(match.group(1), path))
+    versions = [m.version for m in migrations]
+    duplicated = {v for v in versions if versions.count(v) > 1}
+    if duplicated:
+        raise SystemExit(f"Versões repetidas: {', '.join(sorted(duplicated))}")
+    return migrations
+
+
+def _connect(url: str):
+    try:
+        import psycopg
+    except ImportError:
+        raise SystemExit('Instale o psycopg: pip install "psycopg[binary]"') from None
+    # Autocommit: cada `conn.transaction()` vira uma transação de verdade
+    # (e não um savepoint de uma transação externa).
+    return psycopg.connect(url, autocommit=True)
+
+
+def _applied(conn) -> set[str]:
+    with conn.transaction():
+        conn.execute(_CREATE_TABLE)
+    rows = conn.execute("select version from public.schema_migrations").fetchall()
+    return {version for (version,) in rows}
+
+
+def _record(conn, migration: Migration) -> None:
+    conn.execute(
+        "insert into public.schema_migrations (version, name) values (%s, %s)",
+        (migration.version, migration.name),
+    )
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--list", action="store_true",
+                        help="só mostra o estado de cada migração")
+    parser.add_argument("--baseline", metavar="VERSAO",
+                        help="marca as migrações até VERSAO como aplicadas, sem rodar")
+    args = parser.parse_args()
+    if not args.database_url:
+        parser.error("informe --database-url ou a variável DATABASE_URL")
+
+    migrations = discover()
+    with _connect(args.database_url) as conn:
+        applied = _applied(conn)
+        pending = [m for m in migrations if m.version not in applied]
+
+        if args.list:
+            for m in migrations:
+                status = "aplicada" if m.version in applied else "pendente"
+                print(f"{m.name:<40} {status}")
+            return 0
+
+        if args.baseline:
+            with conn.transaction():
+                for m in pending:
+                    if m.version <= args.baseline:
+                        _record(conn, m)
+                        print(f"{m.name}: marcada como aplicada")
+            pending = [m for m in pending if m.version > args.baseline]
+
+        for m in pending:
+            print(f"{m.name}: aplicando...", end=" ", flush=True)
+            with conn.transaction():
+                conn.execute(m.sql())
+                _record(conn, m)
+            print("ok")
+        if not pending:
+            print("Nenhuma migração pendente.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,111 @@
+"""Controle de admissão para as reservas.
+
+Em picos de acesso, várias sessões enviam comprovantes ao mesmo tempo. Um
+token bucket por chave (sessão e telefone do comprador) limita quantas
+reservas cada uma pode enfileirar em sequência.
+
+A concorrência contra o backend não é limitada aqui: quem envia os
+comprovantes e reserva os números são as threads da fila de reservas
+(`utils.submission_queue`), e o número delas (`SUBMISSION_WORKERS`) já é o
+limite de operações simultâneas.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+
+import streamlit as st
+
+from utils.settings import get_setting
+
+# Buckets cheios e parados há mais tempo que isso são descartados.
+_BUCKET_IDLE_SECONDS = 600
+
+
+class AdmissionError(Exception):
+    """Erro base do controle de admissão."""
+
+
+class RateLimited(AdmissionError):
+    """A chave excedeu a taxa permitida; tente após `retry_after` segundos."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(f"Taxa excedida; tente novamente em {retry_after:.0f}s.")
+        self.retry_after = retry_after
+
+
+@dataclass
+class _TokenBucket:
+    capacity: float
+    refill_per_second: float
+    tokens: float
+    updated_at: float = field(default_factory=time.monotonic)
+
+    def refill(self, now: float) -> None:
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.refill_per_second)
+        self.updated_at = now
+
+    def wait_time(self) -> float:
+        """Segundos até haver um token disponível (0 se já houver)."""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.refill_per_second
+
+
+class AdmissionController:
+    """Porteiro compartilhado entre todas as sessões do processo."""
+
+    def __init__(self, bucket_capacity: int, bucket_refill_seconds: float) -> None:
+        self._bucket_capacity = float(bucket_capacity)
+        self._refill_per_second = 1.0 / bucket_refill_seconds
+        self._buckets: dict[str, _TokenBucket] = {}
+        self._buckets_lock = threading.Lock()
+
+    def check_rate(self, keys: Iterable[str]) -> None:
+        """Consome um token de cada chave ou levanta `RateLimited`.
+
+        A verificação é tudo-ou-nada: se alguma chave estiver sem token,
+        nenhuma delas é debitada.
+        """
+        now = time.monotonic()
+        with self._buckets_lock:
+            buckets = [self._bucket(key, now) for key in keys if key]
+            retry_after = max((b.wait_time() for b in buckets), default=0.0)
+            if retry_after > 0:
+                raise RateLimited(retry_after)
+            for bucket in buckets:
+                bucket.tokens -= 1
+            self._prune_buckets(now)
+
+    def _bucket(self, key: str, now: float) -> _TokenBucket:
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = _TokenBucket(
+                self._bucket_capacity, self._refill_per_second,
+                self._bucket_capacity, now,
+            )
+            self._buckets[key] = bucket
+        else:
+            bucket.refill(now)
+        return bucket
+
+    def _prune_buckets(self, now: float) -> None:
+        idle = [
+            key for key, b in self._buckets.items()
+            if now - b.updated_at > _BUCKET_IDLE_SECONDS
+        ]
+        for key in idle:
+            del self._buckets[key]
+
+
+@st.cache_resource
+def get_admission_controller() -> AdmissionController:
+    """Retorna o controlador único do processo, configurado via settings."""
+    return AdmissionController(
+        bucket_capacity=get_setting("ADMISSION_BUCKET_CAPACITY", 3),
+        bucket_refill_seconds=get_setting("ADMISSION_BUCKET_REFILL_SECONDS", 20.0),
+    )
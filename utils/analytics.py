@@ -0,0 +1,181 @@
+"""Agregados de vendas calculados a partir do histórico de eventos.
+
+Os agregados (reservas/confirmações por hora, tempo até a confirmação e taxa
+de rejeição) ficam salvos em `ticket_event_rollups` junto com o instante
+(`created_at`) do último evento lido. Cada atualização lê apenas os eventos
+novos — o histórico nunca é reprocessado.
+"""
+
+from __future__ import annotations
+
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any
+
+from utils.call_policy import call
+from utils.settings import get_setting
+from utils.supabase_client import current_client
+
+EVENT_PAGE_SIZE = 1000
+
+# Faixas do histograma de tempo entre reserva e confirmação (limite superior,
+# em minutos, e rótulo).
+CONFIRMATION_BUCKETS: list[tuple[float, str]] = [
+    (15, "até 15 min"),
+    (60, "15–60 min"),
+    (360, "1–6 h"),
+    (1440, "6–24 h"),
+    (float("inf"), "mais de 24 h"),
+]
+
+
+@dataclass
+class SalesRollup:
+    """Estado incremental dos agregados de uma rifa."""
+
+    # `created_at` do último evento aplicado (ISO)
+    last_event_at: str | None = None
+    reserved: int = 0
+    confirmed: int = 0
+    rejected: int = 0
+    # "AAAA-MM-DDTHH" (UTC) → quantidade
+    reserved_per_hour: dict[str, int] = field(default_factory=dict)
+    confirmed_per_hour: dict[str, int] = field(default_factory=dict)
+    # Reservas ainda sem desfecho: número → instante da reserva (ISO)
+    open_reservations: dict[str, str] = field(default_factory=dict)
+    confirmation_seconds_total: float = 0.0
+    confirmation_count: int = 0
+    confirmation_histogram: dict[str, int] = field(default_factory=dict)
+
+    @property
+    def rejection_rate(self) -> float | None:
+        """Fração das reservas decididas que foram rejeitadas."""
+        decided = self.confirmation_count + self.rejected
+        return self.rejected / decided if decided else None
+
+    @property
+    def mean_confirmation_minutes(self) -> float | None:
+        """Tempo médio entre reserva e confirmação, em minutos."""
+        if not self.confirmation_count:
+            return None
+        return self.confirmation_seconds_total / self.confirmation_count / 60
+
+    def apply(self, event: dict[str, Any]) -> None:
+        """Incorpora um evento de `ticket_events` ao estado."""
+        at = datetime.fromisoformat(event["created_at"])
+        hour = at.strftime("%Y-%m-%dT%H")
+        number = str(event["ticket_number"])
+        kind = event["event_type"]
+
+        if kind == "reserved":
+            self.reserved += 1
+            self.reserved_per_hour[hour] = self.reserved_per_hour.get(hour, 0) + 1
+            self.open_reservations[number] = event["created_at"]
+        elif kind == "confirmed":
+            self.confirmed += 1
+            self.confirmed_per_hour[hour] = self.confirmed_per_hour.get(hour, 0) + 1
+            reserved_at = self.open_reservations.pop(number, None)
+            if reserved_at is not None:  # confirmações manuais não têm reserva
+                seconds = (at - datetime.fromisoformat(reserved_at)).total_seconds()
+                self._add_confirmation_time(seconds)
+        elif kind == "rejected":
+            self.rejected += 1
+            self.open_reservations.pop(number, None)
+        self.last_event_at = event["created_at"]
+
+    def _add_confirmation_time(self, seconds: float) -> None:
+        self.confirmation_seconds_total += seconds
+        self.confirmation_count += 1
+        label = next(
+            label for limit, label in CONFIRMATION_BUCKETS if seconds / 60 <= limit
+        )
+        self.confirmation_histogram[label] = self.confirmation_histogram.get(label, 0) + 1
+
+
+def refresh_sales_rollup(raffle_id: str) -> SalesRollup:
+    """Aplica os eventos novos ao agregado salvo da rifa e o retorna.
+
+    Só entram eventos mais velhos que `ROLLUP_SAFETY_LAG_SECONDS`. O id e o
+    `created_at` de um evento são atribuídos antes do commit, então uma
+    transação lenta pode tornar visível um evento anterior a outro já lido.
+    Passado o atraso, todo evento até o corte já foi commitado, e o cursor
+    avança por `created_at` sem pular nenhum.
+
+    A gravação é condicionada ao `last_event_at` lido: se outra sessão
+    avançou o agregado no meio tempo, esta atualização é descartada (a
+    próxima leitura parte do estado mais novo).
+    """
+    sb = current_client()
+    query = (
+        sb.table("ticket_event_rollups")
+        .select("last_event_at, state")
+        .eq("raffle_id", raffle_id)
+        .limit(1)
+    )
+    res = call("rollups.get", query.execute)
+    stored = res.data[0] if res.data else None
+    rollup = SalesRollup(**stored["state"]) if stored and stored["state"] else SalesRollup()
+    start_at = rollup.last_event_at
+    lag = timedelta(seconds=get_setting("ROLLUP_SAFETY_LAG_SECONDS", 30.0))
+    cutoff = (datetime.now(timezone.utc) - lag).isoformat()
+
+    has_more = True
+    while has_more:
+        events, has_more = _events_page(raffle_id, rollup.last_event_at, cutoff)
+        for event in events:
+            rollup.apply(event)
+
+    if rollup.last_event_at == start_at:
+        return rollup
+
+    payload = {"last_event_at": rollup.last_event_at, "state": asdict(rollup)}
+    if stored is None:
+        query = sb.table("ticket_event_rollups").upsert(
+            {"raffle_id": raffle_id, **payload},
+            on_conflict="raffle_id",
+            ignore_duplicates=True,
+        )
+    else:
+        query = (
+            sb.table("ticket_event_rollups")
+            .update(payload)
+            .eq("raffle_id", raffle_id)
+            .eq("last_event_at", start_at)
+        )
+    call("rollups.save", query.execute, kind="write")
+    return rollup
+
+
+def _events_page(
+    raffle_id: str, after: str | None, cutoff: str
+) -> tuple[list[dict[str, Any]], bool]:
+    """Próxima página de eventos em (after, cutoff] e se há mais depois dela.
+
+    Eventos do mesmo instante (uma confirmação em lote) nunca são separados
+    entre páginas: como o cursor é o instante, a parte que ficasse para a
+    página seguinte seria pulada.
+    """
+    sb = current_client()
+
+    def events_query():
+        return (
+            sb.table("ticket_events")
+            .select("id, ticket_number, event_type, created_at")
+            .eq("raffle_id", raffle_id)
+        )
+
+    query = events_query().lte("created_at", cutoff)
+    if after is not None:
+        query = query.gt("created_at", after)
+    query = query.order("created_at").order("id").limit(EVENT_PAGE_SIZE + 1)
+    events = call("ticket_events.since", query.execute).data
+    if len(events) <= EVENT_PAGE_SIZE:
+        return events, False
+
+    boundary = events[EVENT_PAGE_SIZE]["created_at"]
+    page = [e for e in events[:EVENT_PAGE_SIZE] if e["created_at"] != boundary]
+    if page:
+        return page, True
+    # A página inteira é um único instante: lê o grupo completo.
+    query = events_query().eq("created_at", boundary).order("id")
+    return call("ticket_events.since", query.execute).data, True
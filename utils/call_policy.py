@@ -0,0 +1,283 @@
+"""Política comum para as chamadas ao Supabase: timeout, retentativa e disjuntor.
+
+Toda chamada ao backend passa por `call`, que aplica:
+
+- timeout por tipo de operação (leitura, escrita, upload), para que uma
+  requisição lenta não prenda a thread do script indefinidamente;
+- retentativas com backoff exponencial e jitter, só para operações
+  idempotentes (leituras e uploads endereçados pelo conteúdo);
+- disjuntor (circuit breaker): depois de várias falhas seguidas, as chamadas
+  falham na hora por um tempo, em vez de esperar o timeout de cada uma.
+
+Contadores por operação, latências e o estado do disjuntor ficam em `stats()`.
+"""
+
+from __future__ import annotations
+
+import random
+import statistics
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+from dataclasses import dataclass, field
+from typing import Any, Literal
+
+import streamlit as st
+
+from utils.settings import get_setting
+
+type CallKind = Literal["read", "write", "upload"]
+
+# Operações que podem ser repetidas sem efeito colateral.
+_RETRIED_KINDS: frozenset[str] = frozenset({"read", "upload"})
+# Latências guardadas por operação, para os percentis.
+_LATENCY_WINDOW = 200
+# Nomes das classes de erro de transporte do httpx (sem importar o httpx).
+_TRANSIENT_ERROR_NAMES = {"TransportError", "TimeoutException", "NetworkError"}
+# Códigos do PostgREST para banco inacessível ou cache de esquema não
+# carregado (respondidos com HTTP 503).
+_TRANSIENT_POSTGREST_CODES = {"PGRST000", "PGRST001", "PGRST002"}
+
+
+class BackendUnavailable(Exception):
+    """O backend não respondeu a tempo ou o disjuntor está aberto."""
+
+
+class CallTimeout(BackendUnavailable):
+    """A chamada passou do timeout da operação."""
+
+
+class CircuitOpen(BackendUnavailable):
+    """O disjuntor está aberto; a chamada nem foi feita."""
+
+    def __init__(self, retry_after: float) -> None:
+        super().__init__(
+            f"Backend indisponível; nova tentativa em {retry_after:.0f}s."
+        )
+        self.retry_after = retry_after
+
+
+def is_transient(exc: BaseException) -> bool:
+    """True para falhas de rede, timeouts e respostas 5xx.
+
+    O status HTTP vem em `status_code` (httpx), `status` (`StorageApiError`
+    do storage3) ou `code` (`APIError` do postgrest sem corpo JSON); as
+    quedas do banco atrás do PostgREST chegam como `code="PGRST00x"`.
+    """
+    if isinstance(exc, (BackendUnavailable, ConnectionError, TimeoutError)):
+        return True
+    if any(cls.__name__ in _TRANSIENT_ERROR_NAMES for cls in type(exc).__mro__):
+        return True
+    if getattr(exc, "code", None) in _TRANSIENT_POSTGREST_CODES:
+        return True
+    for attr in ("status_code", "status", "code"):
+        status = str(getattr(exc, attr, None))
+        if status.isdigit() and 500 <= int(status) < 600:
+            return True
+    return False
+
+
+class CircuitBreaker:
+    """Disjuntor clássico: fechado → aberto → meio-aberto → fechado."""
+
+    def __init__(self, failure_threshold: int, reset_after: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: float | None = None
+        self._probing = False
+        self.times_opened = 0
+
+    @property
+    def state(self) -> str:
+        """Estado atual: "closed", "open" ou "half_open"."""
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now: float) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if now - self._opened_at < self.reset_after:
+            return "open"
+        return "half_open"
+
+    def before_call(self) -> None:
+        """Levanta `CircuitOpen` se a chamada não deve ser feita agora.
+
+        No estado meio-aberto, só uma chamada de teste passa por vez.
+        """
+        now = time.monotonic()
+        with self._lock:
+            state = self._state(now)
+            if state == "closed":
+                return
+            if state == "half_open" and not self._probing:
+                self._probing = True
+                return
+            retry_after = max(0.0, self._opened_at + self.reset_after - now)
+            raise CircuitOpen(retry_after)
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def release_probe(self) -> None:
+        """Libera a chamada de teste sem mudar o estado do disjuntor.
+
+        Para chamadas que falharam por um motivo que não diz nada sobre a
+        saúde do backend (ex.: 4xx): a próxima chamada faz um novo teste.
+        """
+        with self._lock:
+            self._probing = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    self.times_opened += 1
+                self._opened_at = time.monotonic()
+                self._probing = False
+
+
+@dataclass
+class _OperationStats:
+    calls: int = 0
+    failures: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    short_circuited: int = 0
+    latencies: deque[float] = field(default_factory=lambda: deque(maxlen=_LATENCY_WINDOW))
+
+
+class CallPolicy:
+    """Aplica timeout, retentativa e disjuntor às chamadas ao backend."""
+
+    def __init__(
+        self,
+        timeouts: dict[str, float],
+        read_retries: int,
+        retry_base_delay: float,
+        retry_max_delay: float,
+        breaker: CircuitBreaker,
+        max_workers: int = 16,
+    ) -> None:
+        self.timeouts = timeouts
+        self.read_retries = read_retries
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.breaker = breaker
+        self._executor = ThreadPoolExecutor(max_workers, thread_name_prefix="backend-call")
+        self._stats: dict[str, _OperationStats] = {}
+        self._stats_lock = threading.Lock()
+
+    def call[T](self, operation: str, fn: Callable[[], T], kind: CallKind = "read") -> T:
+        """Executa `fn` sob a política do tipo `kind`.
+
+        `operation` é só o nome usado nas métricas (ex.: "tickets.reserve").
+        Erros que não são transitórios (ex.: 4xx, violação de constraint)
+        sobem na primeira ocorrência e não contam contra o disjuntor.
+        """
+        attempts = 1 + (self.read_retries if kind in _RETRIED_KINDS else 0)
+        for attempt in range(attempts):
+            try:
+                return self._attempt(operation, fn, self.timeouts[kind])
+            except CircuitOpen:
+                raise
+            except Exception as e:
+                if not is_transient(e) or attempt == attempts - 1:
+                    raise
+            self._record(operation, retries=1)
+            # Full jitter: espera aleatória até o teto exponencial.
+            ceiling = min(self.retry_max_delay, self.retry_base_delay * 2**attempt)
+            time.sleep(random.uniform(0, ceiling))
+        raise AssertionError("inalcançável")
+
+    def _attempt[T](self, operation: str, fn: Callable[[], T], timeout: float) -> T:
+        try:
+            self.breaker.before_call()
+        except CircuitOpen:
+            self._record(operation, short_circuited=1)
+            raise
+
+        started = time.perf_counter()
+        future = self._executor.submit(fn)
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeout:
+            # A thread segue até o timeout HTTP do cliente; o script não espera.
+            future.cancel()
+            self.breaker.record_failure()
+            self._record(operation, calls=1, failures=1, timeouts=1)
+            raise CallTimeout(f"{operation}: sem resposta em {timeout:g}s") from None
+        except Exception as e:
+            if is_transient(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.release_probe()
+            self._record(operation, calls=1, failures=1)
+            raise
+        self.breaker.record_success()
+        self._record(operation, calls=1, latency=time.perf_counter() - started)
+        return result
+
+    def _record(self, operation: str, latency: float | None = None, **counts: int) -> None:
+        with self._stats_lock:
+            stats = self._stats.setdefault(operation, _OperationStats())
+            for name, value in counts.items():
+                setattr(stats, name, getattr(stats, name) + value)
+            if latency is not None:
+                stats.latencies.append(latency)
+
+    def stats(self) -> dict[str, Any]:
+        """Estado do disjuntor e contadores/latências (ms) por operação."""
+        with self._stats_lock:
+            operations = []
+            for name, s in sorted(self._stats.items()):
+                latencies = sorted(s.latencies)
+                p95 = latencies[int(0.95 * (len(latencies) - 1))] if latencies else None
+                operations.append({
+                    "operação": name,
+                    "chamadas": s.calls,
+                    "falhas": s.failures,
+                    "retentativas": s.retries,
+                    "timeouts": s.timeouts,
+                    "bloqueadas": s.short_circuited,
+                    "p50 (ms)": round(statistics.median(latencies) * 1000) if latencies else None,
+                    "p95 (ms)": round(p95 * 1000) if p95 is not None else None,
+                })
+        return {
+            "breaker": self.breaker.state,
+            "times_opened": self.breaker.times_opened,
+            "operations": operations,
+        }
+
+
+@st.cache_resource
+def get_call_policy() -> CallPolicy:
+    """Retorna a política única do processo, configurada via settings."""
+    return CallPolicy(
+        timeouts={
+            "read": get_setting("BACKEND_READ_TIMEOUT", 5.0),
+            "write": get_setting("BACKEND_WRITE_TIMEOUT", 10.0),
+            "upload": get_setting("BACKEND_UPLOAD_TIMEOUT", 30.0),
+        },
+        read_retries=get_setting("BACKEND_READ_RETRIES", 2),
+        retry_base_delay=get_setting("BACKEND_RETRY_BASE_DELAY", 0.2),
+        retry_max_delay=get_setting("BACKEND_RETRY_MAX_DELAY", 2.0),
+        breaker=CircuitBreaker(
+            failure_threshold=get_setting("BACKEND_BREAKER_THRESHOLD", 5),
+            reset_after=get_setting("BACKEND_BREAKER_RESET_SECONDS", 30.0),
+        ),
+    )
+
+
+def call[T](operation: str, fn: Callable[[], T], kind: CallKind = "read") -> T:
+    """Atalho para `get_call_policy().call(...)`."""
+    return get_call_policy().call(operation, fn, kind)
@@ -6,6 +6,9 @@ from typing import Any
 
 import streamlit as st
 
+from utils.pix import PixCharge
+from utils.prize_image import ImageVariant
+
 type TicketDict = dict[str, Any]
 
 
@@ -38,6 +41,24 @@ def render_legend() -> None:
     )
 
 
+def render_prize_image(variants: list[ImageVariant], caption: str) -> None:
+    """Renderiza a imagem do prêmio com `srcset` responsivo."""
+    srcset = ", ".join(f"{v.url} {v.width}w" for v in variants)
+    fallback = variants[0]
+    st.markdown(
+        f"""
+        <figure class="prize-figure">
+            <img src="{fallback.url}" srcset="{srcset}"
+                 sizes="(max-width: 640px) 100vw, 50vw"
+                 width="{fallback.width}" height="{fallback.height}"
+                 alt="Prêmio" decoding="async">
+            <figcaption>{caption}</figcaption>
+        </figure>
+        """,
+        unsafe_allow_html=True,
+    )
+
+
 def render_pix_box(pix_name: str, pix_key: str) -> None:
     """Renderiza a caixa com dados PIX."""
     st.markdown(
@@ -52,6 +73,17 @@ def render_pix_box(pix_name: str, pix_key: str) -> None:
     )
 
 
+def render_pix_charge(charge: PixCharge, total: float) -> None:
+    """Renderiza o QR Code e o "copia e cola" da cobrança do carrinho."""
+    col_qr, col_code = st.columns([1, 2])
+    with col_qr:
+        st.image(charge.qr_png, width=200)
+    with col_code:
+        st.markdown(f"**Pague R$ {total:.2f} com o QR Code ou o PIX copia e cola:**")
+        st.code(charge.payload, language=None)
+        st.caption("O valor já vem preenchido. Depois, anexe o comprovante abaixo.")
+
+
 def format_number(n: int) -> str:
     """Formata um número para exibição (ex: 07, 42)."""
     return f"{n:02d}"
@@ -0,0 +1,136 @@
+"""Cobrança PIX: payload BR Code ("copia e cola") e QR Code com o valor exato.
+
+O payload segue o padrão EMV QRCPS-MPM do Banco Central (campos ID + tamanho
++ valor, terminando no CRC16-CCITT). O QR é gerado sob demanda pelo pacote
+`qrcode`, importado só na primeira cobrança para não pesar no carregamento.
+"""
+
+from __future__ import annotations
+
+import io
+import re
+import unicodedata
+from dataclasses import dataclass
+
+import streamlit as st
+
+from utils.settings import get_setting
+
+_GUI = "br.gov.bcb.pix"
+_CURRENCY_BRL = "986"
+_NAME_MAX = 25
+_CITY_MAX = 15
+# Sem identificador de transação: o comprador é identificado pelo
+# comprovante e pelo código de reserva.
+_NO_TXID = "***"
+_EVP_RE = re.compile(r"^[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}$", re.I)
+_CPF_RE = re.compile(r"^\d{3}\.?\d{3}\.?\d{3}-?\d{2}$")
+_CNPJ_RE = re.compile(r"^\d{2}\.?\d{3}\.?\d{3}/?\d{4}-?\d{2}$")
+
+
+@dataclass(frozen=True)
+class PixCharge:
+    """Cobrança pronta para exibir: texto copia e cola + imagem do QR (PNG)."""
+
+    payload: str
+    qr_png: bytes
+
+
+def _field(field_id: str, value: str) -> str:
+    if len(value) > 99:
+        raise ValueError(f"Campo {field_id} do BR Code excede 99 caracteres.")
+    return f"{field_id}{len(value):02d}{value}"
+
+
+def _ascii(text: str, max_len: int) -> str:
+    """Remove acentos (o BR Code só aceita ASCII) e corta no limite."""
+    normalized = unicodedata.normalize("NFKD", text)
+    return normalized.encode("ascii", "ignore").decode().strip()[:max_len]
+
+
+def _valid_cpf(digits: str) -> bool:
+    """Confere os dois dígitos verificadores de um CPF."""
+    if len(digits) != 11 or digits == digits[0] * 11:
+        return False
+    for size in (9, 10):
+        total = sum(int(d) * w for d, w in zip(digits[:size], range(size + 1, 1, -1)))
+        if total * 10 % 11 % 10 != int(digits[size]):
+            return False
+    return True
+
+
+def normalize_pix_key(key: str) -> str:
+    """Converte a chave digitada para o formato do DICT, o que os bancos aceitam.
+
+    E-mail e chave aleatória ficam em minúsculas, CPF/CNPJ só com dígitos e
+    telefone como +55DDDNNNNNNNNN. Onze dígitos sem pontuação podem ser CPF
+    ou celular com DDD: vale CPF se os dígitos verificadores baterem.
+    Levanta `ValueError` se a chave não se encaixa em nenhum tipo.
+    """
+    key = key.strip()
+    if "@" in key or _EVP_RE.match(key):
+        return key.lower()
+    digits = re.sub(r"\D", "", key)
+    if key.startswith("+"):
+        if digits.startswith("55") and len(digits) in (12, 13):
+            return "+" + digits
+    elif _CNPJ_RE.match(key):
+        return digits
+    elif _CPF_RE.match(key) and (not key.isdigit() or _valid_cpf(digits)):
+        return digits
+    elif len(digits) in (10, 11):
+        return "+55" + digits
+    elif len(digits) in (12, 13) and digits.startswith("55"):
+        return "+" + digits
+    raise ValueError(
+        "Chave PIX inválida: use e-mail, CPF, CNPJ, telefone com DDD ou "
+        "chave aleatória."
+    )
+
+
+def crc16_ccitt(data: str) -> str:
+    """CRC16-CCITT (polinômio 0x1021, inicial 0xFFFF) em 4 dígitos hex."""
+    crc = 0xFFFF
+    for byte in data.encode():
+        crc ^= byte << 8
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x1021) if crc & 0x8000 else crc << 1
+            crc &= 0xFFFF
+    return f"{crc:04X}"
+
+
+def build_brcode(pix_key: str, name: str, city: str, amount_cents: int) -> str:
+    """Monta o payload BR Code estático para uma chave e um valor."""
+    payload = (
+        _field("00", "01")
+        + _field("26", _field("00", _GUI) + _field("01", normalize_pix_key(pix_key)))
+        + _field("52", "0000")
+        + _field("53", _CURRENCY_BRL)
+        + _field("54", f"{amount_cents / 100:.2f}")
+        + _field("58", "BR")
+        + _field("59", _ascii(name, _NAME_MAX) or "N")
+        + _field("60", _ascii(city, _CITY_MAX) or "BRASIL")
+        + _field("62", _field("05", _NO_TXID))
+        + "6304"
+    )
+    return payload + crc16_ccitt(payload)
+
+
+@st.cache_data(max_entries=256, show_spinner=False)
+def get_pix_charge(
+    raffle_id: str, amount_cents: int, pix_key: str, pix_name: str
+) -> PixCharge:
+    """Cobrança de uma rifa para um valor, memorizada por (rifa, valor).
+
+    A chave e o titular entram na chave do cache para que uma edição da rifa
+    no painel gere uma cobrança nova.
+    """
+    import qrcode
+
+    payload = build_brcode(
+        pix_key, pix_name, get_setting("PIX_CITY", "GOIANIA"), amount_cents
+    )
+    image = qrcode.make(payload, box_size=8, border=2)
+    buffer = io.BytesIO()
+    image.save(buffer, format="PNG")
+    return PixCharge(payload, buffer.getvalue())
@@ -0,0 +1,72 @@
+"""Variantes responsivas da imagem do prêmio.
+
+A imagem original é recodificada uma única vez por processo em WebP, em
+algumas larguras, e mantida em memória. As variantes são publicadas na pasta
+`static/` (servida pelo Streamlit com cache do navegador) e a página usa um
+`srcset`, deixando o navegador escolher a variante pelo tamanho da tela.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import io
+from dataclasses import dataclass
+from pathlib import Path
+
+import streamlit as st
+
+_ROOT = Path(__file__).resolve().parent.parent
+_SOURCE = _ROOT / "assets" / "premio.png"
+_STATIC_DIR = _ROOT / "static"
+_STATIC_URL = "app/static"
+_WIDTHS = (480, 960, 1440)
+_WEBP_QUALITY = 80
+
+
+@dataclass(frozen=True)
+class ImageVariant:
+    """Uma largura pré-codificada da imagem."""
+
+    width: int
+    height: int
+    data: bytes
+    url: str
+
+
+@st.cache_resource
+def get_prize_variants() -> list[ImageVariant]:
+    """Codifica as variantes WebP do prêmio (vazio se não houver imagem)."""
+    if not _SOURCE.exists():
+        return []
+
+    from PIL import Image
+
+    variants = []
+    with Image.open(_SOURCE) as original:
+        mode = "RGBA" if "A" in original.getbands() else "RGB"
+        source = original.convert(mode)
+        widths = sorted(
+            {w for w in _WIDTHS if w < source.width} | {min(source.width, _WIDTHS[-1])}
+        )
+        for width in widths:
+            height = round(source.height * width / source.width)
+            buf = io.BytesIO()
+            source.resize((width, height), Image.LANCZOS).save(
+                buf, format="WEBP", quality=_WEBP_QUALITY, method=6
+            )
+            data = buf.getvalue()
+            variants.append(
+                ImageVariant(width, height, data, _publish(f"premio-{width}", data))
+            )
+    return variants
+
+
+def _publish(stem: str, data: bytes) -> str:
+    """Grava a variante em `static/` (nome com hash) e retorna sua URL."""
+    digest = hashlib.sha256(data).hexdigest()[:10]
+    name = f"{stem}-{digest}.webp"
+    path = _STATIC_DIR / name
+    if not path.exists():
+        _STATIC_DIR.mkdir(exist_ok=True)
+        path.write_bytes(data)
+    return f"{_STATIC_URL}/{name}"
@@ -7,16 +7,23 @@ Streamlit focadas apenas em apresentação e interação.
 from __future__ import annotations
 
 import random
-from datetime import datetime, timezone
+import re
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
-from utils.supabase_client import get_supabase
+from utils.call_policy import call
+from utils.supabase_client import current_client
 
 # ── Tipos auxiliares ─────────────────────────────────────────────────────────
 type RaffleDict = dict[str, Any]
 type TicketDict = dict[str, Any]
 
 TICKET_BATCH_SIZE = 500
+RESERVATION_PAGE_SIZE = 50
+_RESERVATION_COLUMNS = (
+    "id, raffle_id, number, buyer_name, buyer_phone, proof_url, proof_hash, "
+    "reservation_code, reserved_at"
+)
 
 
 def _now_iso() -> str:
@@ -24,12 +31,18 @@ def _now_iso() -> str:
     return datetime.now(timezone.utc).isoformat()
 
 
+def normalize_phone(phone: str) -> str:
+    """Mantém apenas os dígitos do telefone (ex: '(62) 9999-0000' → '6299990000')."""
+    return re.sub(r"\D", "", phone)
+
+
 # ── Rifas ────────────────────────────────────────────────────────────────────
 
 def get_active_raffle() -> RaffleDict | None:
     """Retorna a rifa ativa ou None."""
-    sb = get_supabase()
-    res = sb.table("raffles").select("*").eq("status", "active").limit(1).execute()
+    sb = current_client()
+    query = sb.table("raffles").select("*").eq("status", "active").limit(1)
+    res = call("raffles.active", query.execute)
     return res.data[0] if res.data else None
 
 
@@ -42,23 +55,20 @@ def create_raffle(
     pix_name: str,
 ) -> RaffleDict:
     """Cria uma rifa e gera todos os tickets em lote."""
-    sb = get_supabase()
+    sb = current_client()
 
-    new_raffle = (
-        sb.table("raffles")
-        .insert(
-            {
-                "title": title,
-                "description": description,
-                "total_numbers": total_numbers,
-                "price": price,
-                "pix_key": pix_key,
-                "pix_name": pix_name,
-                "status": "active",
-            }
-        )
-        .execute()
+    query = sb.table("raffles").insert(
+        {
+            "title": title,
+            "description": description,
+            "total_numbers": total_numbers,
+            "price": price,
+            "pix_key": pix_key,
+            "pix_name": pix_name,
+            "status": "active",
+        }
     )
+    new_raffle = call("raffles.create", query.execute, kind="write")
     raffle = new_raffle.data[0]
     _generate_tickets(raffle["id"], total_numbers)
     return raffle
@@ -66,8 +76,9 @@ def create_raffle(
 
 def update_raffle(raffle_id: str, **fields: Any) -> None:
     """Atualiza campos arbitrários de uma rifa."""
-    sb = get_supabase()
-    sb.table("raffles").update(fields).eq("id", raffle_id).execute()
+    sb = current_client()
+    query = sb.table("raffles").update(fields).eq("id", raffle_id)
+    call("raffles.update", query.execute, kind="write")
 
 
 def set_winner(raffle_id: str, winner_number: int) -> None:
@@ -79,31 +90,101 @@ def set_winner(raffle_id: str, winner_number: int) -> None:
 
 def get_tickets(raffle_id: str, columns: str = "*") -> list[TicketDict]:
     """Retorna tickets de uma rifa ordenados por número."""
-    sb = get_supabase()
-    res = (
-        sb.table("tickets")
-        .select(columns)
-        .eq("raffle_id", raffle_id)
-        .order("number")
-        .execute()
-    )
-    return res.data
+    sb = current_client()
+    query = sb.table("tickets").select(columns).eq("raffle_id", raffle_id).order("number")
+    return call("tickets.all", query.execute).data
 
 
 def get_tickets_by_status(
     raffle_id: str, status: str, columns: str = "*"
 ) -> list[TicketDict]:
     """Retorna tickets filtrados por status."""
-    sb = get_supabase()
-    res = (
+    sb = current_client()
+    query = (
         sb.table("tickets")
         .select(columns)
         .eq("raffle_id", raffle_id)
         .eq("status", status)
         .order("number")
-        .execute()
     )
-    return res.data
+    return call("tickets.by_status", query.execute).data
+
+
+def count_tickets_by_status(raffle_id: str, status: str) -> int:
+    """Conta os tickets de um status sem trazer as linhas."""
+    sb = current_client()
+    query = (
+        sb.table("tickets")
+        .select("id", count="exact", head=True)
+        .eq("raffle_id", raffle_id)
+        .eq("status", status)
+    )
+    return call("tickets.count", query.execute).count or 0
+
+
+def get_reservation_page(
+    raffle_id: str,
+    after: str | None = None,
+    page_size: int = RESERVATION_PAGE_SIZE,
+    buyer_name: str | None = None,
+    buyer_phone: str | None = None,
+    older_than_minutes: int | None = None,
+) -> tuple[list[TicketDict], str | None]:
+    """Retorna uma página de tickets reservados e o cursor da próxima.
+
+    Paginação por keyset em `reserved_at` (a página seguinte começa depois
+    do cursor). Os números de uma mesma reserva compartilham `reserved_at`
+    e nunca são divididos entre páginas. O cursor é None na última página.
+    """
+    sb = current_client()
+    cutoff = None
+    if older_than_minutes:
+        cutoff = datetime.now(timezone.utc) - timedelta(minutes=older_than_minutes)
+
+    def reserved_query():
+        # Os builders do postgrest acumulam filtros: um novo a cada consulta.
+        query = (
+            sb.table("tickets")
+            .select(_RESERVATION_COLUMNS)
+            .eq("raffle_id", raffle_id)
+            .eq("status", "reserved")
+        )
+        if buyer_name:
+            query = query.ilike("buyer_name", f"%{buyer_name.strip()}%")
+        if buyer_phone:
+            query = query.like("buyer_phone", f"{normalize_phone(buyer_phone)}%")
+        if cutoff is not None:
+            query = query.lte("reserved_at", cutoff.isoformat())
+        return query
+
+    query = reserved_query()
+    if after:
+        query = query.gt("reserved_at", after)
+    query = query.order("reserved_at").order("number").limit(page_size + 1)
+    rows = call("tickets.reservation_page", query.execute).data
+    if len(rows) <= page_size:
+        return rows, None
+
+    # A linha extra diz onde a página corta: a reserva que cruza o limite
+    # fica inteira para a próxima página...
+    boundary = rows[page_size]["reserved_at"]
+    page = [t for t in rows[:page_size] if t["reserved_at"] != boundary]
+    if not page:
+        # ...a menos que uma única reserva seja maior que a página.
+        query = reserved_query().eq("reserved_at", boundary).order("number")
+        page = call("tickets.reservation_page", query.execute).data
+    return page, page[-1]["reserved_at"]
+
+
+def group_reservations(tickets: list[TicketDict]) -> list[list[TicketDict]]:
+    """Agrupa tickets da mesma reserva (código, ou comprador + instante)."""
+    groups: dict[str, list[TicketDict]] = {}
+    for ticket in tickets:
+        key = ticket.get("reservation_code") or (
+            f"{ticket.get('buyer_phone')}|{ticket.get('reserved_at')}"
+        )
+        groups.setdefault(key, []).append(ticket)
+    return list(groups.values())
 
 
 def reserve_tickets(
@@ -112,86 +193,164 @@ def reserve_tickets(
     buyer_name: str,
     buyer_phone: str,
     proof_url: str,
-) -> None:
-    """Reserva uma lista de números para um comprador."""
-    sb = get_supabase()
-    now = _now_iso()
-    for number in numbers:
-        sb.table("tickets").update(
+    reservation_code: str | None = None,
+    proof_hash: str | None = None,
+) -> list[int]:
+    """Reserva os números ainda disponíveis para um comprador.
+
+    Faz uma única atualização condicional e retorna os números efetivamente
+    reservados (os que outro comprador pegou antes ficam de fora).
+    """
+    sb = current_client()
+    query = (
+        sb.table("tickets")
+        .update(
             {
                 "status": "reserved",
                 "buyer_name": buyer_name,
-                "buyer_phone": buyer_phone,
+                "buyer_phone": normalize_phone(buyer_phone),
                 "proof_url": proof_url,
-                "reserved_at": now,
+                "proof_hash": proof_hash,
+                "reservation_code": reservation_code,
+                "reserved_at": _now_iso(),
             }
-        ).eq("raffle_id", raffle_id).eq("number", number).eq(
-            "status", "available"
-        ).execute()
+        )
+        .eq("raffle_id", raffle_id)
+        .in_("number", numbers)
+        .eq("status", "available")
+    )
+    res = call("tickets.reserve", query.execute, kind="write")
+    return sorted(t["number"] for t in res.data)
+
+
+def get_reservation_numbers(raffle_id: str, reservation_code: str) -> list[int]:
+    """Retorna os números que já pertencem a um código de reserva."""
+    sb = current_client()
+    query = (
+        sb.table("tickets")
+        .select("number")
+        .eq("raffle_id", raffle_id)
+        .eq("reservation_code", reservation_code)
+        .order("number")
+    )
+    return [t["number"] for t in call("tickets.by_code", query.execute).data]
+
+
+def get_tickets_by_phone(
+    raffle_id: str, buyer_phone: str, reservation_code: str | None = None
+) -> list[TicketDict]:
+    """Retorna os números de um comprador (consulta "Meus números").
+
+    Atendida pelo índice (raffle_id, buyer_phone); o código de reserva,
+    se informado, restringe o resultado a uma reserva específica.
+    """
+    sb = current_client()
+    query = (
+        sb.table("tickets")
+        .select("number, status, reservation_code, reserved_at, confirmed_at")
+        .eq("raffle_id", raffle_id)
+        .eq("buyer_phone", normalize_phone(buyer_phone))
+    )
+    if reservation_code:
+        query = query.eq("reservation_code", reservation_code.strip().upper())
+    return call("tickets.by_phone", query.order("number").execute).data
 
 
 def confirm_ticket(ticket_id: str) -> None:
     """Confirma o pagamento de um ticket individual."""
-    sb = get_supabase()
-    sb.table("tickets").update(
-        {"status": "confirmed", "confirmed_at": _now_iso()}
-    ).eq("id", ticket_id).execute()
+    sb = current_client()
+    query = (
+        sb.table("tickets")
+        .update({"status": "confirmed", "confirmed_at": _now_iso()})
+        .eq("id", ticket_id)
+        .eq("status", "reserved")
+    )
+    call("tickets.confirm", query.execute, kind="write")
 
 
 def confirm_tickets_bulk(tickets: list[TicketDict]) -> int:
     """Confirma o pagamento de vários tickets. Retorna a quantidade."""
-    for ticket in tickets:
-        confirm_ticket(ticket["id"])
-    return len(tickets)
+    if not tickets:
+        return 0
+    sb = current_client()
+    query = (
+        sb.table("tickets")
+        .update({"status": "confirmed", "confirmed_at": _now_iso()})
+        .in_("id", [t["id"] for t in tickets])
+        .eq("status", "reserved")
+    )
+    res = call("tickets.confirm", query.execute, kind="write")
+    return len(res.data)
 
 
 def reject_ticket(ticket_id: str) -> None:
-    """Rejeita/libera um ticket, voltando ao estado disponível."""
-    sb = get_supabase()
-    sb.table("tickets").update(
-        {
-            "status": "available",
-            "buyer_name": None,
-            "buyer_phone": None,
-            "proof_url": None,
-            "reserved_at": None,
-        }
-    ).eq("id", ticket_id).execute()
+    """Rejeita/libera um ticket reservado, voltando ao estado disponível."""
+    reject_tickets_bulk([{"id": ticket_id}])
 
 
 def reject_tickets_bulk(tickets: list[TicketDict]) -> int:
-    """Rejeita vários tickets. Retorna a quantidade."""
-    for ticket in tickets:
-        reject_ticket(ticket["id"])
-    return len(tickets)
+    """Rejeita vários tickets. Retorna a quantidade.
+
+    Só afeta tickets ainda reservados: uma página antiga do painel não
+    devolve à grade números que outro admin já confirmou. Os dados do
+    comprador são apagados da tabela; o evento de rejeição, gravado pelo
+    trigger de `tickets`, guarda os valores anteriores.
+    """
+    if not tickets:
+        return 0
+    sb = current_client()
+    query = (
+        sb.table("tickets")
+        .update(
+            {
+                "status": "available",
+                "buyer_name": None,
+                "buyer_phone": None,
+                "proof_url": None,
+                "proof_hash": None,
+                "reservation_code": None,
+                "reserved_at": None,
+            }
+        )
+        .in_("id", [t["id"] for t in tickets])
+        .eq("status", "reserved")
+    )
+    res = call("tickets.reject", query.execute, kind="write")
+    return len(res.data)
 
 
 def confirm_ticket_manual(
     raffle_id: str, number: int, buyer_name: str, buyer_phone: str
 ) -> None:
     """Confirma um número diretamente (pagamento presencial)."""
-    sb = get_supabase()
-    sb.table("tickets").update(
-        {
-            "status": "confirmed",
-            "buyer_name": buyer_name,
-            "buyer_phone": buyer_phone,
-            "confirmed_at": _now_iso(),
-        }
-    ).eq("raffle_id", raffle_id).eq("number", number).execute()
+    sb = current_client()
+    query = (
+        sb.table("tickets")
+        .update(
+            {
+                "status": "confirmed",
+                "buyer_name": buyer_name,
+                "buyer_phone": normalize_phone(buyer_phone),
+                "confirmed_at": _now_iso(),
+            }
+        )
+        .eq("raffle_id", raffle_id)
+        .eq("number", number)
+    )
+    call("tickets.confirm_manual", query.execute, kind="write")
 
 
 def get_winner_ticket(raffle_id: str, winner_number: int) -> TicketDict | None:
     """Retorna o ticket vencedor."""
-    sb = get_supabase()
-    res = (
+    sb = current_client()
+    query = (
         sb.table("tickets")
         .select("*")
         .eq("raffle_id", raffle_id)
         .eq("number", winner_number)
         .limit(1)
-        .execute()
     )
+    res = call("tickets.winner", query.execute)
     return res.data[0] if res.data else None
 
 
@@ -205,15 +364,51 @@ def draw_winner(raffle_id: str) -> TicketDict:
     return winner
 
 
+# ── Arquivo ──────────────────────────────────────────────────────────────────
+
+def get_unarchived_finished_raffles() -> list[RaffleDict]:
+    """Rifas encerradas cujos tickets ainda estão na tabela quente."""
+    sb = current_client()
+    query = (
+        sb.table("raffles")
+        .select("id, title, total_numbers, winner_number, created_at")
+        .eq("status", "finished")
+        .is_("archived_at", "null")
+        .order("created_at")
+    )
+    return call("raffles.unarchived", query.execute).data
+
+
+def archive_raffle(raffle_id: str) -> dict[str, Any]:
+    """Arquiva uma rifa encerrada e retorna o resumo gravado.
+
+    A função `archive_raffle` do banco move os tickets para
+    `tickets_archive` e grava o resumo em `raffle_summaries` numa única
+    transação; chamá-la de novo não repete o trabalho. Só usuários logados
+    podem executá-la: precisa do cliente autenticado da sessão do painel.
+    """
+    sb = current_client()
+    query = sb.rpc("archive_raffle", {"p_raffle_id": raffle_id})
+    return call("raffles.archive", query.execute, kind="write").data[0]
+
+
+def get_raffle_summaries() -> list[dict[str, Any]]:
+    """Resumos das rifas arquivadas, da mais recente para a mais antiga."""
+    sb = current_client()
+    query = sb.table("raffle_summaries").select("*").order("archived_at", desc=True)
+    return call("raffle_summaries.list", query.execute).data
+
+
 # ── Helpers internos ─────────────────────────────────────────────────────────
 
 def _generate_tickets(raffle_id: str, total: int) -> None:
     """Gera os tickets da rifa em lotes."""
-    sb = get_supabase()
+    sb = current_client()
     tickets = [
         {"raffle_id": raffle_id, "number": i, "status": "available"}
         for i in range(1, total + 1)
     ]
     for start in range(0, len(tickets), TICKET_BATCH_SIZE):
         chunk = tickets[start : start + TICKET_BATCH_SIZE]
-        sb.table("tickets").insert(chunk).execute()
+        query = sb.table("tickets").insert(chunk)
+        call("tickets.generate", query.execute, kind="write")
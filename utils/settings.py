@@ -0,0 +1,24 @@
+"""Leitura de configurações opcionais da aplicação.
+
+Cada configuração pode vir de uma variável de ambiente ou do
+`.streamlit/secrets.toml`, nessa ordem; na ausência de ambas vale o default.
+"""
+
+from __future__ import annotations
+
+import os
+
+import streamlit as st
+
+
+def get_setting[T: (int, float, str)](name: str, default: T) -> T:
+    """Retorna a configuração `name` convertida para o tipo do default."""
+    value = os.environ.get(name)
+    if value is None:
+        try:
+            value = st.secrets.get(name)
+        except FileNotFoundError:  # sem secrets.toml (ex.: scripts locais)
+            value = None
+    if value is None:
+        return default
+    return type(default)(value)
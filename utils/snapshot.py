@@ -0,0 +1,172 @@
+"""Snapshot local dos dados públicos, servido no modo stale-while-revalidate.
+
+A página pública lê a rifa ativa e a grade de números deste snapshot: ele é
+servido na hora (inclusive num cold start, a partir do disco) e revalidado em
+segundo plano. Se o Supabase estiver lento ou fora do ar, a página continua
+de pé com os últimos dados bons, marcados como desatualizados.
+"""
+
+from __future__ import annotations
+
+import gzip
+import json
+import os
+import threading
+import time
+from collections.abc import Callable
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+import streamlit as st
+
+from utils.raffle_service import RaffleDict, TicketDict, get_active_raffle, get_tickets
+from utils.settings import get_setting
+
+_FORMAT_VERSION = 1
+_STATUS_TO_CODE = {"available": "a", "reserved": "r", "confirmed": "c"}
+_CODE_TO_STATUS = {code: status for status, code in _STATUS_TO_CODE.items()}
+
+type Fetcher = Callable[[], tuple[RaffleDict | None, list[TicketDict]]]
+
+
+@dataclass(frozen=True)
+class PublicSnapshot:
+    """Rifa ativa + grade de números, com o instante em que foram lidos."""
+
+    raffle: RaffleDict | None
+    tickets: list[TicketDict]
+    fetched_at: float
+    stale_after: float
+
+    @property
+    def age(self) -> float:
+        """Segundos desde a última leitura bem-sucedida do backend."""
+        return time.time() - self.fetched_at
+
+    @property
+    def is_stale(self) -> bool:
+        """True se os dados são velhos demais para aceitar reservas."""
+        return self.age > self.stale_after
+
+    def fetched_at_label(self, tz: str) -> str:
+        """Horário da leitura no formato HH:MM."""
+        return datetime.fromtimestamp(self.fetched_at, ZoneInfo(tz)).strftime("%H:%M")
+
+
+class SnapshotStore:
+    """Mantém o último snapshot bom em memória e em disco."""
+
+    def __init__(
+        self,
+        path: str | Path,
+        fetch: Fetcher,
+        revalidate_after: float,
+        stale_after: float,
+    ) -> None:
+        self._path = Path(path)
+        self._fetch = fetch
+        self._revalidate_after = revalidate_after
+        self._stale_after = stale_after
+        self._snapshot: PublicSnapshot | None = None
+        self._lock = threading.Lock()
+        self._refreshing = threading.Lock()
+        self.last_error: Exception | None = None
+
+    def get(self) -> PublicSnapshot:
+        """Retorna o snapshot atual, disparando revalidação se necessário.
+
+        Só bloqueia no backend quando não há nada salvo (nem em memória nem
+        em disco); nesse caso, erros do backend são propagados.
+        """
+        with self._lock:
+            snapshot = self._snapshot
+        if snapshot is None:
+            snapshot = self._read_disk()
+            if snapshot is None:
+                return self._revalidate()
+            with self._lock:
+                self._snapshot = snapshot
+            self.refresh_async()
+        elif snapshot.age >= self._revalidate_after:
+            self.refresh_async()
+        return snapshot
+
+    def refresh_async(self) -> None:
+        """Revalida em segundo plano (no máximo uma revalidação por vez)."""
+        if not self._refreshing.acquire(blocking=False):
+            return
+        threading.Thread(
+            target=self._refresh_in_background, name="snapshot-refresh", daemon=True
+        ).start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self._revalidate()
+        except Exception as e:  # mantém o snapshot antigo; tenta de novo depois
+            self.last_error = e
+        finally:
+            self._refreshing.release()
+
+    def _revalidate(self) -> PublicSnapshot:
+        raffle, tickets = self._fetch()
+        snapshot = PublicSnapshot(raffle, tickets, time.time(), self._stale_after)
+        with self._lock:
+            self._snapshot = snapshot
+        self.last_error = None
+        self._write_disk(snapshot)
+        return snapshot
+
+    # ── Formato em disco ─────────────────────────────────────────────────────
+    # JSON gzipado; os status vão concatenados como uma string de uma letra
+    # por número ("aarc..."), o que mantém grades de milhares de números
+    # em poucos KB.
+
+    def _write_disk(self, snapshot: PublicSnapshot) -> None:
+        payload = {
+            "v": _FORMAT_VERSION,
+            "fetched_at": snapshot.fetched_at,
+            "raffle": snapshot.raffle,
+            "numbers": [t["number"] for t in snapshot.tickets],
+            "statuses": "".join(_STATUS_TO_CODE[t["status"]] for t in snapshot.tickets),
+        }
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self._path.with_suffix(self._path.suffix + ".tmp")
+        with gzip.open(tmp, "wt", encoding="utf-8") as fh:
+            json.dump(payload, fh, separators=(",", ":"))
+        os.replace(tmp, self._path)
+
+    def _read_disk(self) -> PublicSnapshot | None:
+        try:
+            with gzip.open(self._path, "rt", encoding="utf-8") as fh:
+                payload = json.load(fh)
+        except (OSError, ValueError):
+            return None
+        if payload.get("v") != _FORMAT_VERSION:
+            return None
+        tickets = [
+            {"number": number, "status": _CODE_TO_STATUS[code]}
+            for number, code in zip(payload["numbers"], payload["statuses"])
+        ]
+        return PublicSnapshot(
+            payload["raffle"], tickets, payload["fetched_at"], self._stale_after
+        )
+
+
+def _fetch_public_data() -> tuple[RaffleDict | None, list[TicketDict]]:
+    raffle = get_active_raffle()
+    if raffle is None:
+        return None, []
+    return raffle, get_tickets(raffle["id"], columns="number, status")
+
+
+@st.cache_resource
+def get_snapshot_store() -> SnapshotStore:
+    """Retorna o snapshot público compartilhado pelo processo."""
+    return SnapshotStore(
+        get_setting("SNAPSHOT_PATH", ".data/public_snapshot.json.gz"),
+        _fetch_public_data,
+        revalidate_after=get_setting("SNAPSHOT_REVALIDATE_SECONDS", 5.0),
+        stale_after=get_setting("SNAPSHOT_STALE_SECONDS", 60.0),
+    )
@@ -1,32 +1,128 @@
-"""Upload de comprovantes de pagamento para o Supabase Storage."""
+"""Upload de comprovantes de pagamento para o Supabase Storage.
+
+Os arquivos são endereçados pelo conteúdo (SHA-256): bytes idênticos nunca
+são enviados duas vezes. A tabela `proof_hashes` funciona como índice de
+hashes e guarda qual reserva enviou cada comprovante primeiro, o que permite
+sinalizar o mesmo comprovante PIX reaproveitado em outra reserva.
+"""
 
 from __future__ import annotations
 
-import time
+import hashlib
+from dataclasses import dataclass
 
-from utils.supabase_client import get_supabase
+from utils.call_policy import call
+from utils.supabase_client import current_client
 
 _BUCKET = "proofs"
 _DEFAULT_EXT = "png"
 _DEFAULT_CONTENT_TYPE = "image/png"
 
 
-def _build_storage_path(raffle_id: str, ticket_number: int, filename: str) -> str:
-    """Monta o caminho de armazenamento do arquivo."""
-    timestamp = int(time.time())
-    ext = filename.rsplit(".", 1)[-1] if "." in filename else _DEFAULT_EXT
-    return f"{raffle_id}/{ticket_number}_{timestamp}.{ext}"
+@dataclass(frozen=True)
+class StoredProof:
+    """Comprovante já armazenado."""
+
+    url: str
+    sha256: str
+    # Reserva que enviou estes bytes pela primeira vez
+    first_reservation_code: str | None
+
+
+def _build_storage_path(sha256: str, filename: str) -> str:
+    """Monta o caminho de armazenamento a partir do hash do conteúdo."""
+    ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else _DEFAULT_EXT
+    return f"{sha256[:2]}/{sha256}.{ext}"
+
+
+def store_proof(
+    raffle_id: str,
+    reservation_code: str | None,
+    data: bytes,
+    filename: str,
+    content_type: str | None,
+) -> StoredProof:
+    """Armazena o comprovante (se ainda não existir) e retorna sua URL.
+
+    Se o hash já está no índice, nada é enviado e o resultado aponta para
+    a reserva que usou esses bytes primeiro.
+    """
+    sha256 = hashlib.sha256(data).hexdigest()
+    known = _find_proof(sha256)
+    if known is not None:
+        return known
 
+    sb = current_client()
+    path = _build_storage_path(sha256, filename)
+    try:
+        call(
+            "storage.upload",
+            lambda: sb.storage.from_(_BUCKET).upload(
+                path,
+                data,
+                file_options={"content-type": content_type or _DEFAULT_CONTENT_TYPE},
+            ),
+            kind="upload",
+        )
+    except Exception as e:
+        # Mesmo caminho ⇔ mesmos bytes: outra sessão (ou uma tentativa cuja
+        # resposta se perdeu) já gravou este comprovante.
+        if not _already_stored(e):
+            raise
+    query = sb.table("proof_hashes").upsert(
+        {
+            "sha256": sha256,
+            "path": path,
+            "first_raffle_id": raffle_id,
+            "first_reservation_code": reservation_code,
+        },
+        on_conflict="sha256",
+        ignore_duplicates=True,
+    )
+    res = call("proof_hashes.register", query.execute, kind="write")
+    if not res.data:
+        # Outra sessão registrou os mesmos bytes ao mesmo tempo: vale o dela.
+        return _find_proof(sha256)
+    return StoredProof(
+        sb.storage.from_(_BUCKET).get_public_url(path), sha256, reservation_code
+    )
 
-def upload_proof(raffle_id: str, ticket_number: int, file) -> str:
-    """Faz upload do comprovante e retorna a URL pública."""
-    sb = get_supabase()
-    path = _build_storage_path(raffle_id, ticket_number, file.name)
 
-    sb.storage.from_(_BUCKET).upload(
-        path,
-        file.read(),
-        file_options={"content-type": file.type or _DEFAULT_CONTENT_TYPE},
+def get_proof_origins(hashes: list[str]) -> dict[str, str | None]:
+    """Mapeia cada hash para o código da reserva que o enviou primeiro."""
+    if not hashes:
+        return {}
+    sb = current_client()
+    query = (
+        sb.table("proof_hashes")
+        .select("sha256, first_reservation_code")
+        .in_("sha256", sorted(set(hashes)))
     )
+    res = call("proof_hashes.origins", query.execute)
+    return {row["sha256"]: row["first_reservation_code"] for row in res.data}
+
+
+def _already_stored(exc: Exception) -> bool:
+    """True se o upload falhou porque o objeto já existe no bucket."""
+    return getattr(exc, "code", None) == "Duplicate" or str(
+        getattr(exc, "status", "")
+    ) == "409"
 
-    return sb.storage.from_(_BUCKET).get_public_url(path)
+
+def _find_proof(sha256: str) -> StoredProof | None:
+    sb = current_client()
+    query = (
+        sb.table("proof_hashes")
+        .select("path, first_reservation_code")
+        .eq("sha256", sha256)
+        .limit(1)
+    )
+    res = call("proof_hashes.find", query.execute)
+    if not res.data:
+        return None
+    row = res.data[0]
+    return StoredProof(
+        sb.storage.from_(_BUCKET).get_public_url(row["path"]),
+        sha256,
+        row["first_reservation_code"],
+    )
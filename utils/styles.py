@@ -97,6 +97,11 @@ MAIN_PAGE_CSS = f"""
 .legend-item {{display: flex; align-items: center; gap: 5px; font-size: .85rem;}}
 .legend-dot  {{width: 14px; height: 14px; border-radius: 4px; display: inline-block;}}
 
+/* ── Imagem do prêmio ──────────────────────────── */
+.prize-figure {{margin: 0 0 12px; text-align: center;}}
+.prize-figure img {{width: 100%; height: auto; border-radius: 10px;}}
+.prize-figure figcaption {{font-size: .85rem; color: #aaa; margin-top: 6px;}}
+
 /* ── Caixa PIX ─────────────────────────────────── */
 .pix-box {{
     background: #1A1F2E;
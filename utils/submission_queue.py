@@ -0,0 +1,328 @@
+"""Fila durável (write-behind) para as reservas enviadas pelo público.
+
+O formulário grava a submissão (bytes do comprovante + números escolhidos)
+num SQLite local e responde na hora com um código. Threads em segundo plano
+drenam a fila em lotes: enviam o comprovante ao Storage, reservam os números
+e registram o resultado, que o comprador consulta pelo código. Submissões
+aceitas sobrevivem a reinícios do processo.
+"""
+
+from __future__ import annotations
+
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+
+import streamlit as st
+
+from utils.call_policy import is_transient
+from utils.raffle_service import get_reservation_numbers, reserve_tickets
+from utils.settings import get_setting
+from utils.storage import store_proof
+
+_SCHEMA = """
+create table if not exists submissions (
+    id text primary key,
+    raffle_id text not null,
+    numbers text not null,
+    buyer_name text not null,
+    buyer_phone text not null,
+    proof blob,
+    proof_name text not null,
+    proof_type text,
+    status text not null default 'pending',
+    attempts integer not null default 0,
+    deferrals integer not null default 0,
+    next_attempt_at real not null,
+    reserved_numbers text,
+    error text,
+    created_at real not null,
+    updated_at real not null
+);
+create index if not exists idx_submissions_due
+    on submissions(status, next_attempt_at);
+"""
+
+_RETRY_BASE_SECONDS = 2.0
+_RETRY_MAX_SECONDS = 60.0
+_IDLE_POLL_SECONDS = 1.0
+
+
+@dataclass(frozen=True)
+class Submission:
+    """Estado de uma submissão na fila."""
+
+    id: str
+    raffle_id: str
+    numbers: list[int]
+    buyer_name: str
+    buyer_phone: str
+    proof_name: str
+    proof_type: str | None
+    status: str  # pending | processing | done | failed
+    attempts: int
+    # Reagendamentos por backend indisponível (não contam em `attempts`)
+    deferrals: int
+    reserved_numbers: list[int] | None
+    error: str | None
+    created_at: float
+    updated_at: float
+
+    @property
+    def missing_numbers(self) -> list[int]:
+        """Números pedidos que não puderam ser reservados."""
+        reserved = set(self.reserved_numbers or [])
+        return [n for n in self.numbers if n not in reserved]
+
+
+class SubmissionQueue:
+    """Fila persistida em SQLite, segura para uso entre threads."""
+
+    def __init__(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        self.has_work = threading.Event()
+        with self._lock, self._conn:
+            self._conn.execute("pragma journal_mode=wal")
+            self._conn.executescript(_SCHEMA)
+            columns = {
+                row["name"]
+                for row in self._conn.execute("pragma table_info(submissions)")
+            }
+            if "deferrals" not in columns:  # filas gravadas por versões anteriores
+                self._conn.execute(
+                    "alter table submissions add column deferrals integer not null default 0"
+                )
+            # Trabalho interrompido por um reinício volta para a fila.
+            self._conn.execute(
+                "update submissions set status = 'pending' where status = 'processing'"
+            )
+        self.has_work.set()
+
+    def enqueue(
+        self,
+        raffle_id: str,
+        numbers: list[int],
+        buyer_name: str,
+        buyer_phone: str,
+        proof: bytes,
+        proof_name: str,
+        proof_type: str | None,
+    ) -> str:
+        """Grava a submissão de forma durável e retorna seu código."""
+        code = secrets.token_hex(4).upper()
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                insert into submissions (
+                    id, raffle_id, numbers, buyer_name, buyer_phone, proof,
+                    proof_name, proof_type, next_attempt_at, created_at, updated_at
+                ) values (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (
+                    code, raffle_id, json.dumps(numbers), buyer_name, buyer_phone,
+                    proof, proof_name, proof_type, now, now, now,
+                ),
+            )
+        self.has_work.set()
+        return code
+
+    def get(self, code: str) -> Submission | None:
+        """Retorna o estado atual de uma submissão."""
+        with self._lock:
+            row = self._conn.execute(
+                "select * from submissions where id = ?", (code,)
+            ).fetchone()
+        return _to_submission(row) if row else None
+
+    def position(self, code: str) -> int | None:
+        """Posição (1 = a próxima) de uma submissão que ainda aguarda na fila.
+
+        Conta as submissões pendentes ou em processamento enviadas antes
+        dela; None se ela já foi concluída ou não existe.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "select status, created_at from submissions where id = ?", (code,)
+            ).fetchone()
+            if row is None or row["status"] not in ("pending", "processing"):
+                return None
+            (ahead,) = self._conn.execute(
+                """
+                select count(*) from submissions
+                where status in ('pending', 'processing')
+                  and (created_at < ? or (created_at = ? and id < ?))
+                """,
+                (row["created_at"], row["created_at"], code),
+            ).fetchone()
+        return ahead + 1
+
+    def claim_batch(self, limit: int) -> list[tuple[Submission, bytes]]:
+        """Marca até `limit` submissões vencidas como em processamento."""
+        with self._lock, self._conn:
+            rows = self._conn.execute(
+                """
+                select * from submissions
+                where status = 'pending' and next_attempt_at <= ?
+                order by next_attempt_at
+                limit ?
+                """,
+                (time.time(), limit),
+            ).fetchall()
+            self._conn.executemany(
+                "update submissions set status = 'processing', updated_at = ? "
+                "where id = ?",
+                [(time.time(), row["id"]) for row in rows],
+            )
+        return [(_to_submission(row), row["proof"]) for row in rows]
+
+    def mark_done(self, code: str, reserved_numbers: list[int]) -> None:
+        """Registra o resultado e descarta os bytes do comprovante."""
+        with self._lock, self._conn:
+            self._conn.execute(
+                """
+                update submissions
+                set status = 'done', reserved_numbers = ?, proof = null,
+                    error = null, updated_at = ?
+                where id = ?
+                """,
+                (json.dumps(reserved_numbers), time.time(), code),
+            )
+
+    def mark_retry(self, code: str, error: str, max_attempts: int) -> None:
+        """Agenda nova tentativa com backoff exponencial, ou marca como falha."""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "select attempts from submissions where id = ?", (code,)
+            ).fetchone()
+            attempts = row["attempts"] + 1
+            status = "failed" if attempts >= max_attempts else "pending"
+            delay = min(_RETRY_MAX_SECONDS, _RETRY_BASE_SECONDS * 2 ** (attempts - 1))
+            self._conn.execute(
+                """
+                update submissions
+                set status = ?, attempts = ?, error = ?,
+                    next_attempt_at = ?, updated_at = ?
+                where id = ?
+                """,
+                (status, attempts, error, time.time() + delay, time.time(), code),
+            )
+        if status == "pending":
+            self.has_work.set()
+
+    def defer(self, code: str, error: str, retry_after: float = 0.0) -> None:
+        """Reagenda sem gastar uma tentativa: o backend estava indisponível.
+
+        Uma queda do backend (timeout, disjuntor aberto, 5xx) não leva
+        submissões aceitas a `failed`; elas esperam pelo menos `retry_after`
+        (o disjuntor reabrir) e seguem na fila.
+        """
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "select deferrals from submissions where id = ?", (code,)
+            ).fetchone()
+            deferrals = row["deferrals"] + 1
+            backoff = min(
+                _RETRY_MAX_SECONDS, _RETRY_BASE_SECONDS * 2 ** min(deferrals - 1, 5)
+            )
+            self._conn.execute(
+                """
+                update submissions
+                set status = 'pending', deferrals = ?, error = ?,
+                    next_attempt_at = ?, updated_at = ?
+                where id = ?
+                """,
+                (
+                    deferrals, error, time.time() + max(retry_after, backoff),
+                    time.time(), code,
+                ),
+            )
+        self.has_work.set()
+
+
+def _to_submission(row: sqlite3.Row) -> Submission:
+    reserved = row["reserved_numbers"]
+    return Submission(
+        id=row["id"],
+        raffle_id=row["raffle_id"],
+        numbers=json.loads(row["numbers"]),
+        buyer_name=row["buyer_name"],
+        buyer_phone=row["buyer_phone"],
+        proof_name=row["proof_name"],
+        proof_type=row["proof_type"],
+        status=row["status"],
+        attempts=row["attempts"],
+        deferrals=row["deferrals"],
+        reserved_numbers=json.loads(reserved) if reserved is not None else None,
+        error=row["error"],
+        created_at=row["created_at"],
+        updated_at=row["updated_at"],
+    )
+
+
+# ── Worker ───────────────────────────────────────────────────────────────────
+
+def process_submission(sub: Submission, proof: bytes) -> list[int]:
+    """Envia o comprovante e reserva os números de uma submissão.
+
+    Números já gravados com o mesmo código contam como reservados: uma
+    tentativa anterior pode ter reservado e perdido a resposta, ou o processo
+    pode ter caído antes de `mark_done` (o reinício devolve a submissão à
+    fila sem registrar tentativa). A consulta usa o índice por código.
+    """
+    already = get_reservation_numbers(sub.raffle_id, sub.id)
+    pending = [n for n in sub.numbers if n not in already]
+    if not pending:
+        return sorted(already)
+    stored = store_proof(
+        sub.raffle_id, sub.id, proof, sub.proof_name, sub.proof_type
+    )
+    reserved = reserve_tickets(
+        sub.raffle_id, pending, sub.buyer_name, sub.buyer_phone,
+        stored.url, reservation_code=sub.id, proof_hash=stored.sha256,
+    )
+    return sorted(already + reserved)
+
+
+def _worker_loop(queue: SubmissionQueue, batch_size: int, max_attempts: int) -> None:
+    while True:
+        queue.has_work.wait(_IDLE_POLL_SECONDS)
+        queue.has_work.clear()
+        batch = queue.claim_batch(batch_size)
+        if batch:
+            queue.has_work.set()  # pode haver mais itens além deste lote
+        for sub, proof in batch:
+            try:
+                reserved = process_submission(sub, proof)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+                if is_transient(e):  # backend fora do ar: não gasta tentativa
+                    queue.defer(sub.id, error, getattr(e, "retry_after", 0.0))
+                else:  # qualquer outra falha vira retentativa
+                    queue.mark_retry(sub.id, error, max_attempts)
+            else:
+                queue.mark_done(sub.id, reserved)
+
+
+@st.cache_resource
+def get_submission_queue() -> SubmissionQueue:
+    """Abre a fila do processo e inicia as threads que a drenam."""
+    queue = SubmissionQueue(get_setting("SUBMISSION_QUEUE_PATH", ".data/submissions.db"))
+    batch_size = get_setting("SUBMISSION_BATCH_SIZE", 10)
+    max_attempts = get_setting("SUBMISSION_MAX_ATTEMPTS", 6)
+    for i in range(get_setting("SUBMISSION_WORKERS", 2)):
+        threading.Thread(
+            target=_worker_loop,
+            args=(queue, batch_size, max_attempts),
+            name=f"submission-worker-{i}",
+            daemon=True,
+        ).start()
+    return queue
@@ -1,10 +1,219 @@
+"""Clientes Supabase do processo.
+
+- `get_supabase()`: cliente anônimo compartilhado por todas as sessões, usado
+  nas leituras públicas e nas reservas. Nunca faz login.
+- `get_client_pool()`: clientes autenticados, um por sessão do painel admin,
+  criados no login e devolvidos ao pool ao sair ou depois de ficarem ociosos.
+- `current_client()`: o cliente que os serviços usam — o autenticado da
+  sessão admin em curso, se houver, senão o anônimo.
+
+Todos compartilham um único `httpx.Client`, com limites de conexão e
+keep-alive próprios: um cliente a mais não abre um pool de conexões novo.
+O `httpx.Client` não carrega cabeçalhos de autenticação — cada cliente
+Supabase envia os seus a cada requisição —, então o login de um admin não
+vaza para o cliente anônimo nem para outras sessões.
+"""
+
+from __future__ import annotations
+
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from dataclasses import dataclass
+from importlib.util import find_spec
+from typing import TYPE_CHECKING
+
 import streamlit as st
-from supabase import create_client, Client
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+from utils.settings import get_setting
+
+if TYPE_CHECKING:
+    import httpx
+    from supabase import Client
+
+# Chave da sessão do Streamlit com o identificador do cliente do admin.
+ADMIN_SESSION_KEY = "admin_session"
 
 
 @st.cache_resource
-def get_supabase() -> Client:
-    """Retorna uma instancia unica do cliente Supabase."""
+def _get_http_client() -> httpx.Client:
+    """Pool de conexões HTTP único do processo.
+
+    Com um `httpx_client` próprio, o Supabase ignora os timeouts do
+    `ClientOptions`; por isso o timeout vai aqui, no maior dos limites da
+    política de chamadas (`utils.call_policy`) — ela já corta a espera do
+    script antes, isto só libera a thread abandonada.
+    """
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=get_setting("SUPABASE_MAX_CONNECTIONS", 20),
+        max_keepalive_connections=get_setting("SUPABASE_MAX_KEEPALIVE", 10),
+        keepalive_expiry=get_setting("SUPABASE_KEEPALIVE_EXPIRY", 30.0),
+    )
+    timeout = httpx.Timeout(
+        max(
+            get_setting("BACKEND_READ_TIMEOUT", 5.0),
+            get_setting("BACKEND_WRITE_TIMEOUT", 10.0),
+            get_setting("BACKEND_UPLOAD_TIMEOUT", 30.0),
+        ),
+        connect=get_setting("BACKEND_READ_TIMEOUT", 5.0),
+    )
+    return httpx.Client(
+        limits=limits,
+        timeout=timeout,
+        follow_redirects=True,
+        http2=find_spec("h2") is not None,
+    )
+
+
+def _create_client(auto_refresh_token: bool = False) -> Client:
+    """Novo cliente Supabase sobre o pool HTTP compartilhado.
+
+    O pacote `supabase` (e suas dependências HTTP) só é importado na primeira
+    chamada, para não pesar no carregamento das páginas.
+    """
+    from supabase import ClientOptions, create_client
+
     url: str = st.secrets["SUPABASE_URL"]
     key: str = st.secrets["SUPABASE_KEY"]
-    return create_client(url, key)
+    options = ClientOptions(
+        httpx_client=_get_http_client(),
+        persist_session=False,
+        auto_refresh_token=auto_refresh_token,
+    )
+    return create_client(url, key, options)
+
+
+@st.cache_resource
+def get_supabase() -> Client:
+    """Retorna o cliente anônimo, único e compartilhado entre as sessões."""
+    return _create_client()
+
+
+# ── Pool de clientes autenticados ────────────────────────────────────────────
+@dataclass
+class _Lease:
+    client: Client
+    last_used: float
+
+
+class ClientPool:
+    """Clientes autenticados emprestados às sessões do painel admin.
+
+    `sign_in` entrega um identificador opaco, que a sessão guarda no lugar
+    do token; `get` devolve o cliente enquanto ele estiver em uso. Clientes
+    liberados (por `sign_out`, por ociosidade ou para abrir espaço) fazem
+    logout e voltam para a lista de livres, prontos para o próximo login.
+    """
+
+    def __init__(
+        self,
+        factory: Callable[[], Client],
+        max_size: int,
+        idle_seconds: float,
+    ) -> None:
+        self.factory = factory
+        self.max_size = max_size
+        self.idle_seconds = idle_seconds
+        self._lock = threading.Lock()
+        self._leases: OrderedDict[str, _Lease] = OrderedDict()
+        self._free: list[Client] = []
+
+    def sign_in(self, email: str, password: str) -> str:
+        """Faz login num cliente do pool e retorna o identificador da sessão.
+
+        Erros de autenticação sobem para quem chamou; o cliente volta ao pool.
+        """
+        with self._lock:
+            released = self._expire(time.monotonic())
+            if len(self._leases) >= self.max_size:
+                # Pool cheio: a sessão usada há mais tempo perde o login.
+                released.append(self._leases.popitem(last=False)[1].client)
+            client = self._free.pop() if self._free else None
+        self._recycle(released)
+
+        client = client or self.factory()
+        try:
+            client.auth.sign_in_with_password({"email": email, "password": password})
+        except Exception:
+            self._recycle([client])
+            raise
+        key = secrets.token_urlsafe(16)
+        with self._lock:
+            self._leases[key] = _Lease(client, time.monotonic())
+        return key
+
+    def get(self, key: str | None) -> Client | None:
+        """Cliente da sessão `key`, ou None se ela saiu ou expirou."""
+        if key is None:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            released = self._expire(now)
+            lease = self._leases.get(key)
+            if lease is not None:
+                lease.last_used = now
+                self._leases.move_to_end(key)
+        self._recycle(released)
+        return lease.client if lease is not None else None
+
+    def sign_out(self, key: str | None) -> None:
+        """Encerra a sessão `key` e devolve o cliente ao pool."""
+        with self._lock:
+            lease = self._leases.pop(key, None) if key is not None else None
+        if lease is not None:
+            self._recycle([lease.client])
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {"em uso": len(self._leases), "livres": len(self._free)}
+
+    def _expire(self, now: float) -> list[Client]:
+        """Remove (com o lock) as sessões ociosas; retorna seus clientes."""
+        expired = [
+            key for key, lease in self._leases.items()
+            if now - lease.last_used > self.idle_seconds
+        ]
+        return [self._leases.pop(key).client for key in expired]
+
+    def _recycle(self, clients: list[Client]) -> None:
+        """Faz logout (fora do lock, é uma chamada de rede) e guarda os clientes."""
+        for client in clients:
+            try:
+                # Escopo local: outras sessões do mesmo admin continuam válidas.
+                client.auth.sign_out({"scope": "local"})
+            except Exception:
+                # O logout local sempre acontece; só a revogação remota falhou.
+                pass
+        with self._lock:
+            room = self.max_size - len(self._free)
+            self._free.extend(clients[:max(room, 0)])
+
+
+@st.cache_resource
+def get_client_pool() -> ClientPool:
+    """Retorna o pool único de clientes autenticados do processo."""
+    return ClientPool(
+        factory=lambda: _create_client(auto_refresh_token=True),
+        max_size=get_setting("ADMIN_CLIENT_POOL_SIZE", 8),
+        idle_seconds=get_setting("ADMIN_SESSION_IDLE_SECONDS", 1800.0),
+    )
+
+
+def current_client() -> Client:
+    """Cliente da sessão em curso: o autenticado do admin, ou o anônimo.
+
+    Fora de uma thread de script (workers da fila, snapshot de métricas) não
+    há sessão, e o cliente é sempre o anônimo.
+    """
+    if get_script_run_ctx(suppress_warning=True) is not None:
+        key = st.session_state.get(ADMIN_SESSION_KEY)
+        if key is not None:
+            client = get_client_pool().get(key)
+            if client is not None:
+                return client
+    return get_supabase()